@@ -1,10 +1,17 @@
 import sys
 import os
+import hashlib
 import logging
+import threading
+import time
 import traceback
+from collections import Counter, OrderedDict, deque
+from functools import partial
+from itertools import count
 from PyQt5 import QtWidgets, QtCore, QtGui
 from PyQt5.QtGui import QPixmap, QMovie
-from PyQt5.QtNetwork import QNetworkAccessManager, QNetworkRequest
+from PyQt5.QtNetwork import QNetworkAccessManager, QNetworkDiskCache, QNetworkRequest
+from history_store import STORE_DIR, HistoryStore
 
 logging.basicConfig(filename='app.log', filemode='w', format='%(name)s - %(levelname)s - %(message)s')
 
@@ -14,16 +21,598 @@ def handle_exception(exc_type, exc_value, exc_traceback):
 
 sys.excepthook = handle_exception
 
+MAX_HISTORY_ITEMS = 200
+MAX_HISTORY_BYTES = 64 * 1024 * 1024  # Full payloads and thumbnails together
+THUMBNAIL_SIZE = 64
+GIF_CACHE_BYTES = 32 * 1024 * 1024  # Scaled frames kept per animation
+COALESCE_MS = 50  # dataChanged bursts closer together than this are handled once
+LARGE_TEXT_CHARS = 64 * 1024  # Longer text is previewed a chunk at a time
+TEXT_CHUNK_CHARS = 16 * 1024
+TEXT_WINDOW_CHUNKS = 4  # Chunks kept in the QTextEdit at once
+MEDIA_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp')
+MAX_DOWNLOADS = 2  # Remote previews fetched at once; the rest wait
+MAX_PENDING_DOWNLOADS = 8
+MAX_DOWNLOAD_BYTES = 20 * 1024 * 1024
+DOWNLOAD_TIMEOUT_MS = 15000
+MEDIA_CACHE_DIR = os.path.join(STORE_DIR, "media")
+MEDIA_CACHE_BYTES = 200 * 1024 * 1024
+THUMBNAIL_CACHE_DIR = os.path.join(STORE_DIR, "thumbnails")
+THUMBNAIL_CACHE_FILES = 2000
+# Formats password managers add to mark a copy that must not be kept
+PRIVATE_FORMATS = ("ExcludeClipboardContentFromMonitorProcessing", "Clipboard Viewer Ignore",
+                   "x-kde-passwordManagerHint")
+SUMMARY_NAMES = 10  # Names listed when several files or a folder are copied
+SUMMARY_TYPES = 6  # Extensions broken out before the rest count as "other"
+WALK_PROGRESS_MS = 200  # How often a folder walk reports its running totals
+
+def image_digest(image):
+    """Content hash of an image: its size, format and every pixel"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{image.width()}x{image.height()}:{image.format()}".encode())
+    bits = image.constBits()
+    if bits is not None:
+        bits.setsize(image_bytes(image))
+        digest.update(bits)
+    return digest.digest()
+
+def chunk_end(text, start, size=TEXT_CHUNK_CHARS):
+    """End of the chunk starting at start, cut after a line break when there is one"""
+    end = start + size
+    if end >= len(text):
+        return len(text)
+    newline = text.rfind("\n", start, end)
+    return newline + 1 if newline >= start else end
+
+def png_bytes(image):
+    """Encode an image as PNG; QImage is reentrant, so this may run on any thread"""
+    buffer = QtCore.QBuffer()
+    buffer.open(QtCore.QIODevice.WriteOnly)
+    image.save(buffer, "PNG")
+    return bytes(buffer.data())
+
+def image_reader(source):
+    """QImageReader for a path or for downloaded bytes"""
+    if isinstance(source, QtCore.QByteArray):
+        buffer = QtCore.QBuffer()
+        buffer.setData(source)
+        buffer.open(QtCore.QIODevice.ReadOnly)
+        reader = QtGui.QImageReader(buffer)
+        reader.buffer = buffer  # The reader does not own its device
+        return reader
+    return QtGui.QImageReader(source)
+
+def read_scaled(source, width, height):
+    """Decode a path or bytes at the size it will be shown.
+
+    QImageReader.setScaledSize lets formats such as JPEG decode at a reduced
+    size instead of producing the full image and scaling it afterwards.
+    """
+    reader = image_reader(source)
+    reader.setAutoTransform(True)
+    size = reader.size()
+    if size.isValid() and (size.width() > width or size.height() > height):
+        reader.setScaledSize(size.scaled(width, height, QtCore.Qt.KeepAspectRatio))
+    return reader.read()
+
+def is_private(mime):
+    """True if a password manager (or similar) asked clipboard tools to ignore this copy"""
+    for name in mime.formats():
+        if any(marker in name for marker in PRIVATE_FORMATS):
+            return True
+        if "CanIncludeInClipboardHistory" in name and bytes(mime.data(name))[:4] == b"\0\0\0\0":
+            return True
+    return False
+
+def is_remote_media(url):
+    return url.scheme() in ("http", "https") and url.path().lower().endswith(MEDIA_EXTENSIONS)
+
+def image_bytes(image):
+    return image.sizeInBytes() if hasattr(image, "sizeInBytes") else image.byteCount()
+
+def format_size(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+def format_selection(summary, done):
+    """Preview text for copied files and folders from a SelectionWalker summary"""
+    lines = [f"{summary['items']} item(s) copied" if summary["items"] > 1 else f"Folder: {summary['root']}"]
+    totals = f"{summary['files']:,} files, {summary['folders']:,} folders, {format_size(summary['bytes'])}"
+    lines.append(totals if done else totals + " (counting...)")
+    if summary["types"]:
+        common = summary["types"].most_common(SUMMARY_TYPES)
+        other = summary["files"] - sum(number for _, number in common)
+        types = [f"{ext or 'no extension'} {number:,}" for ext, number in common]
+        if other:
+            types.append(f"other {other:,}")
+        lines.append("Types: " + ", ".join(types))
+    if summary["errors"]:
+        lines.append(f"{summary['errors']:,} entries could not be read")
+    lines.append("")
+    lines.extend(summary["names"])
+    shown = summary["items"] if summary["items"] > 1 else summary["children"]
+    if shown > len(summary["names"]):
+        lines.append(f"... and {shown - len(summary['names']):,} more")
+    return "\n".join(lines)
+
+class WalkSignals(QtCore.QObject):
+    progress = QtCore.pyqtSignal(int, object, bool)
+
+class SelectionWalker(QtCore.QRunnable):
+    """Counts the files, bytes and extensions under a set of copied paths.
+
+    Runs on a QThreadPool thread and walks directories with os.scandir
+    without following symlinks. Running totals are emitted at most every
+    WALK_PROGRESS_MS, each as a copy the GUI thread may keep, and a final
+    one with done set. Setting cancelled stops the walk at the next entry.
+    """
+    def __init__(self, paths, job_id=0):
+        super().__init__()
+        self.paths = paths
+        self.job_id = job_id
+        self.cancelled = False
+        self.signals = WalkSignals()
+        # With a single folder, its own entries are listed instead of the selection
+        root = paths[0] if len(paths) == 1 else None
+        self.summary = {
+            "items": len(paths), "root": root, "children": 0,
+            "files": 0, "folders": 0, "bytes": 0, "errors": 0, "types": Counter(),
+            "names": [] if root else [os.path.basename(path.rstrip(os.sep)) or path for path in paths[:SUMMARY_NAMES]]
+        }
+
+    def snapshot(self):
+        return dict(self.summary, types=Counter(self.summary["types"]), names=list(self.summary["names"]))
+
+    def count_file(self, name, size):
+        self.summary["files"] += 1
+        self.summary["bytes"] += size
+        self.summary["types"][os.path.splitext(name)[1].lower()] += 1
+
+    def run(self):
+        summary = self.summary
+        pending = []
+        for path in self.paths:
+            try:
+                if os.path.isdir(path) and not os.path.islink(path):
+                    pending.append(path)
+                    if summary["items"] > 1:
+                        summary["folders"] += 1
+                else:
+                    self.count_file(path, os.lstat(path).st_size)
+            except OSError:
+                summary["errors"] += 1
+        last_report = time.monotonic()
+        while pending:
+            directory = pending.pop()
+            listing = directory == summary["root"]
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if self.cancelled:
+                            return
+                        if listing:
+                            summary["children"] += 1
+                            if len(summary["names"]) < SUMMARY_NAMES:
+                                summary["names"].append(entry.name)
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                summary["folders"] += 1
+                                pending.append(entry.path)
+                            else:
+                                self.count_file(entry.name, entry.stat(follow_symlinks=False).st_size)
+                        except OSError:
+                            summary["errors"] += 1
+                        now = time.monotonic()
+                        if now - last_report >= WALK_PROGRESS_MS / 1000:
+                            last_report = now
+                            self.signals.progress.emit(self.job_id, self.snapshot(), False)
+            except OSError:
+                summary["errors"] += 1
+        if not self.cancelled:
+            self.signals.progress.emit(self.job_id, self.snapshot(), True)
+
+class ImageJobSignals(QtCore.QObject):
+    finished = QtCore.pyqtSignal(int, QtGui.QImage)
+
+class DigestSignals(QtCore.QObject):
+    finished = QtCore.pyqtSignal(int, object, object)
+
+class ImageDigestJob(QtCore.QRunnable):
+    """Hashes a copied image on a QThreadPool thread.
+
+    The image shown before it is hashed too when its digest is not known
+    yet; signals.finished carries (job_id, digest, previous digest or None).
+    """
+    def __init__(self, image, previous=None, job_id=0):
+        super().__init__()
+        self.image = image
+        self.previous = previous
+        self.job_id = job_id
+        self.signals = DigestSignals()
+
+    def run(self):
+        digest = image_digest(self.image)
+        previous = image_digest(self.previous) if self.previous is not None else None
+        self.signals.finished.emit(self.job_id, digest, previous)
+
+class ThumbnailCache:
+    """Scaled previews of image files, kept on disk across runs.
+
+    Entries are keyed by the file's path, mtime and size plus the preview
+    size, so an edited file simply gets a new key; the oldest entries are
+    removed at startup once there are more than max_files.
+    """
+    def __init__(self, directory=THUMBNAIL_CACHE_DIR, max_files=THUMBNAIL_CACHE_FILES):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.prune(max_files)
+
+    def cache_path(self, path, width, height):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        key = f"{os.path.abspath(path)}|{stat.st_mtime_ns}|{stat.st_size}|{width}x{height}"
+        return os.path.join(self.directory, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".png")
+
+    def load(self, path, width, height):
+        cache_path = self.cache_path(path, width, height)
+        if cache_path is None or not os.path.exists(cache_path):
+            return None
+        image = QtGui.QImage(cache_path)
+        return None if image.isNull() else image
+
+    def save(self, path, width, height, image):
+        cache_path = self.cache_path(path, width, height)
+        if cache_path is None:
+            return
+        # Two jobs may scale the same file at once, so each writes its own temp file
+        tmp_path = f"{cache_path}.{threading.get_ident()}.tmp"
+        try:
+            if image.save(tmp_path, "PNG"):
+                os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print("Error caching thumbnail:", e)
+
+    def prune(self, max_files):
+        try:
+            entries = [entry for entry in os.scandir(self.directory) if entry.name.endswith(".png")]
+            if len(entries) > max_files:
+                entries.sort(key=lambda entry: entry.stat().st_mtime)
+                for entry in entries[:len(entries) - max_files]:
+                    os.remove(entry.path)
+        except OSError as e:
+            print("Error pruning thumbnail cache:", e)
+
+class ImageScaleJob(QtCore.QRunnable):
+    """Decodes (when given a path or bytes) and scales an image on a QThreadPool thread.
+
+    QPixmap may only be used on the GUI thread, so the result is a QImage
+    delivered through signals.finished. A cancelled job emits nothing.
+    Previews of files are read from and written to the thumbnail cache.
+    """
+    def __init__(self, source, width, height, job_id=0, cache=None):
+        super().__init__()
+        self.source = source
+        self.width = width
+        self.height = height
+        self.job_id = job_id
+        self.cache = cache
+        self.cancelled = False
+        self.signals = ImageJobSignals()
+
+    def run(self):
+        if self.cancelled:
+            return
+        is_file = isinstance(self.source, str)
+        image = None
+        if is_file and self.cache is not None:
+            image = self.cache.load(self.source, self.width, self.height)
+        if image is None:
+            if is_file or isinstance(self.source, QtCore.QByteArray):
+                image = read_scaled(self.source, self.width, self.height)
+            else:
+                image = self.source
+            if self.cancelled:
+                return
+            if not image.isNull():
+                image = image.scaled(self.width, self.height, QtCore.Qt.KeepAspectRatio, QtCore.Qt.SmoothTransformation)
+                if is_file and self.cache is not None:
+                    self.cache.save(self.source, self.width, self.height, image)
+        if not self.cancelled:
+            self.signals.finished.emit(self.job_id, image)
+
+class GifPlayer(QtCore.QObject):
+    """Plays a GIF decoded straight at display size.
+
+    The QMovie decodes each frame at the scaled size. During the first loop
+    the scaled frames are kept. If the whole loop fits in the budget, the
+    movie is stopped and later loops replay from memory on a timer without
+    decoding. Otherwise the frames are dropped and the movie keeps decoding.
+    Only GIFs that loop forever are replayed; one with a loop count plays
+    through the QMovie, which stops after the last loop.
+    """
+    frameReady = QtCore.pyqtSignal(QPixmap)
+
+    def __init__(self, source, size, budget=GIF_CACHE_BYTES, parent=None):
+        super().__init__(parent)
+        if isinstance(source, QtCore.QByteArray):
+            self.buffer = QtCore.QBuffer(self)
+            self.buffer.setData(source)
+            self.buffer.open(QtCore.QIODevice.ReadOnly)
+            self.movie = QMovie(self.buffer, QtCore.QByteArray(), self)
+        else:
+            self.movie = QMovie(source, parent=self)
+        self.movie.setCacheMode(QMovie.CacheNone)
+        self.movie.setScaledSize(size)
+        self.movie.frameChanged.connect(self.on_frame)
+        self.budget = budget
+        self.frames = []
+        self.cache_bytes = 0
+        self.caching = True
+        self.position = 0
+        self.timer = QtCore.QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.next_cached_frame)
+
+    def start(self):
+        self.movie.start()
+
+    def stop(self):
+        self.movie.stop()
+        self.timer.stop()
+        self.frames = []
+        self.cache_bytes = 0
+
+    def on_frame(self, frame_number):
+        pixmap = self.movie.currentPixmap()
+        self.frameReady.emit(pixmap)
+        if not self.caching:
+            return
+        if self.movie.loopCount() != -1:
+            self.caching = False
+            self.frames = []
+            self.cache_bytes = 0
+            return
+        if frame_number == 0 and self.frames:
+            # Back at the start with every frame cached: replay from memory
+            self.movie.stop()
+            self.position = 0
+            self.timer.start(self.frames[0][1])
+            return
+        frame_bytes = pixmap.width() * pixmap.height() * 4
+        if frame_number != len(self.frames) or self.cache_bytes + frame_bytes > self.budget:
+            self.caching = False
+            self.frames = []
+            self.cache_bytes = 0
+            return
+        self.frames.append((pixmap, max(self.movie.nextFrameDelay(), 20)))
+        self.cache_bytes += frame_bytes
+
+    def next_cached_frame(self):
+        self.position = (self.position + 1) % len(self.frames)
+        pixmap, delay = self.frames[self.position]
+        self.frameReady.emit(pixmap)
+        self.timer.start(delay)
+
+class RemoteMediaLoader(QtCore.QObject):
+    """Downloads copied image and GIF URLs for preview.
+
+    At most max_downloads run at once, and the newest of the waiting URLs
+    goes next. A download is aborted when it is not an image, is larger than
+    max_bytes or takes longer than timeout_ms. Responses pass through a
+    QNetworkDiskCache, which stores them by URL with their ETag and
+    Last-Modified. A fresh copy is read from disk, and a stale one is
+    revalidated with a conditional request.
+    """
+    loaded = QtCore.pyqtSignal(str, QtCore.QByteArray, bool)
+    failed = QtCore.pyqtSignal(str, str)
+
+    def __init__(self, manager, cache_dir=MEDIA_CACHE_DIR, max_downloads=MAX_DOWNLOADS,
+                 max_bytes=MAX_DOWNLOAD_BYTES, timeout_ms=DOWNLOAD_TIMEOUT_MS):
+        super().__init__()
+        self.manager = manager
+        if cache_dir:
+            cache = QNetworkDiskCache(self)
+            cache.setCacheDirectory(cache_dir)
+            cache.setMaximumCacheSize(MEDIA_CACHE_BYTES)
+            self.manager.setCache(cache)
+        self.max_downloads = max_downloads
+        self.max_bytes = max_bytes
+        self.timeout_ms = timeout_ms
+        self.pending = deque(maxlen=MAX_PENDING_DOWNLOADS)
+        self.active = {}
+
+    def fetch(self, url):
+        if url in self.pending or any(url == download[0] for download in self.active.values()):
+            return
+        self.pending.append(url)
+        self.start_next()
+
+    def start_next(self):
+        while self.pending and len(self.active) < self.max_downloads:
+            url = self.pending.pop()
+            request = QNetworkRequest(QtCore.QUrl(url))
+            request.setAttribute(QNetworkRequest.FollowRedirectsAttribute, True)
+            reply = self.manager.get(request)
+            # [url, reason it was aborted]
+            self.active[reply] = [url, None]
+
+            timer = QtCore.QTimer(reply)
+            timer.setSingleShot(True)
+            timer.timeout.connect(partial(self.abort, reply, "timed out"))
+            timer.start(self.timeout_ms)
+            reply.metaDataChanged.connect(partial(self.check_headers, reply))
+            reply.downloadProgress.connect(partial(self.check_progress, reply))
+            reply.finished.connect(partial(self.on_finished, reply))
+
+    def abort(self, reply, reason):
+        if reply in self.active and self.active[reply][1] is None:
+            self.active[reply][1] = reason
+            reply.abort()
+
+    def check_headers(self, reply):
+        length = reply.header(QNetworkRequest.ContentLengthHeader)
+        content_type = reply.header(QNetworkRequest.ContentTypeHeader) or ""
+        if length is not None and int(length) > self.max_bytes:
+            self.abort(reply, f"larger than {self.max_bytes} bytes")
+        elif content_type and not content_type.startswith("image/"):
+            self.abort(reply, f"not an image ({content_type})")
+
+    def check_progress(self, reply, received, total):
+        if received > self.max_bytes:
+            self.abort(reply, f"larger than {self.max_bytes} bytes")
+
+    def on_finished(self, reply):
+        url, reason = self.active.pop(reply)
+        reply.deleteLater()
+        if reason is not None or reply.error():
+            self.failed.emit(url, reason or reply.errorString())
+        else:
+            data = reply.readAll()
+            self.loaded.emit(url, data, data.startsWith(b"GIF8"))
+        self.start_next()
+
+class HistoryEntry:
+    """One copied item: a short summary, a small thumbnail and, until evicted, the full payload"""
+    def __init__(self, kind, summary, payload, payload_bytes):
+        self.kind = kind
+        self.summary = summary
+        self.payload = payload
+        self.payload_bytes = payload_bytes
+        self.thumbnail = None
+        self.thumbnail_bytes = 0
+
+class ClipboardHistory(QtCore.QObject):
+    """Ring of recent clipboard items capped by count and by total bytes.
+
+    When the byte cap is exceeded, full payloads are dropped least recently
+    used first; their summaries and thumbnails stay in the ring. Only if
+    that is not enough are the oldest entries removed altogether. A payload
+    larger than the whole cap is never kept, so it cannot empty the ring.
+    """
+    changed = QtCore.pyqtSignal()
+
+    def __init__(self, max_items=MAX_HISTORY_ITEMS, max_bytes=MAX_HISTORY_BYTES, thumbnails=None):
+        super().__init__()
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.thumbnails = thumbnails
+        self.entries = deque()
+        self.payload_lru = OrderedDict()
+        self.total_bytes = 0
+        self.job_ids = count()
+        self.pending_thumbnails = {}
+
+    def add(self, entry):
+        self.entries.append(entry)
+        self.total_bytes += entry.payload_bytes + entry.thumbnail_bytes
+        if entry.payload_bytes > self.max_bytes:
+            # Keeping it would push every other payload out first
+            self.release_payload(entry)
+        elif entry.payload is not None:
+            self.payload_lru[id(entry)] = entry
+        while len(self.entries) > self.max_items:
+            self.drop_oldest()
+        self.evict()
+        self.changed.emit()
+
+    def add_text(self, text):
+        summary = " ".join(text[:200].split())[:80]
+        self.add(HistoryEntry("text", summary, text, sys.getsizeof(text)))
+
+    def add_image(self, image, summary="Image"):
+        entry = HistoryEntry("image", summary, image, image_bytes(image))
+        self.add(entry)
+        self.request_thumbnail(entry, image)
+
+    def add_image_file(self, path, is_gif=False):
+        entry = HistoryEntry("gif" if is_gif else "image", os.path.basename(path), path, sys.getsizeof(path))
+        self.add(entry)
+        self.request_thumbnail(entry, path)
+
+    def request_thumbnail(self, entry, source):
+        """Scale the thumbnail on the thread pool and attach it when done"""
+        job = ImageScaleJob(source, THUMBNAIL_SIZE, THUMBNAIL_SIZE, next(self.job_ids), self.thumbnails)
+        job.signals.finished.connect(self.on_thumbnail)
+        self.pending_thumbnails[job.job_id] = entry
+        QtCore.QThreadPool.globalInstance().start(job)
+
+    def on_thumbnail(self, job_id, thumbnail):
+        entry = self.pending_thumbnails.pop(job_id, None)
+        if entry is None or thumbnail.isNull() or entry not in self.entries:
+            return
+        entry.thumbnail = thumbnail
+        entry.thumbnail_bytes = image_bytes(thumbnail)
+        self.total_bytes += entry.thumbnail_bytes
+        self.evict()
+        self.changed.emit()
+
+    def touch(self, entry):
+        """Mark an entry's payload as recently used"""
+        if id(entry) in self.payload_lru:
+            self.payload_lru.move_to_end(id(entry))
+
+    def evict(self):
+        while self.total_bytes > self.max_bytes and self.payload_lru:
+            _, entry = self.payload_lru.popitem(last=False)
+            self.release_payload(entry)
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+            self.drop_oldest()
+
+    def release_payload(self, entry):
+        self.total_bytes -= entry.payload_bytes
+        entry.payload = None
+        entry.payload_bytes = 0
+
+    def drop_oldest(self):
+        entry = self.entries.popleft()
+        if self.payload_lru.pop(id(entry), None) is not None:
+            self.release_payload(entry)
+        self.total_bytes -= entry.thumbnail_bytes
+
 class ClipboardWatcher(QtWidgets.QWidget):
     def __init__(self):
         super().__init__()
         self.initUI()
         self.clipboard = QtWidgets.QApplication.clipboard()
-        self.previous_clipboard_content = self.clipboard.text()
+        # Key of the content last shown; repeats of it are not redrawn
+        self.previous_clipboard_key = None
+        self.coalesced_events = 0
+        self.skipped_changes = 0
+        self.change_timer = QtCore.QTimer(self)
+        self.change_timer.setSingleShot(True)
+        self.change_timer.setInterval(COALESCE_MS)
+        self.change_timer.timeout.connect(self.process_clipboard_change)
         self.clipboard.dataChanged.connect(self.on_clipboard_change)
         self.network_manager = QNetworkAccessManager()
-        self.network_manager.finished.connect(self.on_download_finished)
+        self.media_loader = RemoteMediaLoader(self.network_manager)
+        self.media_loader.loaded.connect(self.on_media_loaded)
+        self.media_loader.failed.connect(self.on_media_failed)
+        # Remote preview to show when it arrives, unless something newer was copied
+        self.current_media_url = None
+        # Folder walks get their own small pool so they never hold up image decoding
+        self.walk_pool = QtCore.QThreadPool(self)
+        self.walk_pool.setMaxThreadCount(2)
+        self.walk_ids = count(1)
+        self.walk_job = None
+        # The image shown last, and its pixel digest once something needed it
+        self.previous_image = None
+        self.previous_image_digest = None
+        self.digest_ids = count(1)
+        self.digest_job = None
         self.copied_text_display = CopiedTextDisplay()
+        self.history = ClipboardHistory(thumbnails=self.copied_text_display.thumbnails)
+        # Everything captured is also kept on disk, written in the background
+        self.store = HistoryStore()
+        QtWidgets.QApplication.instance().aboutToQuit.connect(self.store.close)
+        # walk_pool waits for running walks when destroyed, so stop them first
+        QtWidgets.QApplication.instance().aboutToQuit.connect(self.cancel_walk)
+        self.history_panel = ClipboardHistoryPanel(self.history, self.show_history_entry, self.store)
+        self.copied_text_display.historyButton.clicked.connect(self.toggle_history)
+        self.copied_text_display.clearButton.clicked.connect(self.forget_clipboard_content)
 
     def initUI(self):
         self.setWindowFlags(QtCore.Qt.FramelessWindowHint | QtCore.Qt.WindowStaysOnTopHint | QtCore.Qt.Tool)
@@ -47,58 +636,184 @@ class ClipboardWatcher(QtWidgets.QWidget):
         self.label.setGraphicsEffect(effect)
 
     def on_clipboard_change(self):
+        """Restart the debounce timer; a burst of changes is read once it settles"""
+        if self.change_timer.isActive():
+            self.coalesced_events += 1
+        self.change_timer.start()
+
+    def is_unchanged(self, key):
+        """True if key matches the content already shown; otherwise remember it"""
+        if key == self.previous_clipboard_key:
+            self.skipped_changes += 1
+            return True
+        self.previous_clipboard_key = key
+        self.drop_pending_work()
+        return False
+
+    def forget_clipboard_content(self):
+        self.previous_clipboard_key = None
+        self.drop_pending_work()
+
+    def drop_pending_work(self):
+        """Stop work started for the content shown before"""
+        self.current_media_url = None
+        self.cancel_walk()
+        self.digest_job = None
+        self.previous_image = None
+        self.previous_image_digest = None
+
+    def process_clipboard_change(self):
         mime = self.clipboard.mimeData()
+        if is_private(mime):
+            # Not shown, and kept neither in the history nor on disk
+            self.forget_clipboard_content()
+            return
         if mime.hasImage():
             try:
                 image = self.clipboard.image()
-                self.copied_text_display.update_image(image)
+                key = ("image", image.width(), image.height(), image.format())
+                if key != self.previous_clipboard_key:
+                    self.is_unchanged(key)
+                    self.show_copied_image(image)
+                    return
+                # Same size and format as the image shown last; whether the
+                # pixels match too is worked out off the GUI thread
+                previous = self.previous_image if self.previous_image_digest is None else None
+                self.digest_job = ImageDigestJob(image, previous, next(self.digest_ids))
+                self.digest_job.signals.finished.connect(self.on_image_digest)
+                QtCore.QThreadPool.globalInstance().start(self.digest_job)
             except Exception as e:
                 print("Error processing image:", e)
         elif mime.hasUrls():
             try:
                 urls = mime.urls()
-                if urls:
-                    first_url = urls[0]
-                if first_url.isLocalFile():
+                if not urls or self.is_unchanged(("urls", tuple(url.toString() for url in urls))):
+                    return
+                first_url = urls[0]
+                if len(urls) > 1 and all(url.isLocalFile() for url in urls):
+                    paths = [url.toLocalFile() for url in urls]
+                    self.show_selection(paths)
+                    self.history.add_text("\n".join(paths))
+                    self.store.add_text("\n".join(paths), kind="files")
+                elif first_url.isLocalFile():
                     local_path = first_url.toLocalFile()
                     if os.path.isfile(local_path):
                         if local_path.endswith('.gif'):
                             self.copied_text_display.update_image(local_path, is_gif=True)
+                            self.history.add_image_file(local_path, is_gif=True)
+                            self.store.add_file(local_path, kind="gif")
                         elif local_path.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.tiff')):
                             self.copied_text_display.update_image(local_path)
+                            self.history.add_image_file(local_path)
+                            self.store.add_file(local_path, kind="image")
                         else:
                             self.copied_text_display.update_text(f"File: {local_path}")
+                            self.history.add_text(f"File: {local_path}")
+                            self.store.add_file(local_path)
                     elif os.path.isdir(local_path):
-                        self.copied_text_display.update_text(f"Folder: {local_path}")
+                        self.show_selection([local_path])
+                        self.history.add_text(f"Folder: {local_path}")
+                        self.store.add_text(local_path, kind="folder")
                 else:
                     remote_url = first_url.toString()
                     self.copied_text_display.update_text(f"URL: {remote_url}")
+                    self.history.add_text(f"URL: {remote_url}")
+                    self.store.add_text(remote_url, kind="url")
+                    if is_remote_media(first_url):
+                        self.download_media(remote_url)
             except Exception as e:
                 print("Error handling URL:", e)
         elif mime.hasText():
             text = self.clipboard.text()
+            if self.is_unchanged(("text", len(text), hash(text))):
+                return
             self.show_bubble()
             self.copied_text_display.update_text(text)
+            self.history.add_text(text)
+            self.store.add_text(text)
+            # A copied image address arrives as plain text
+            url = QtCore.QUrl(text.strip())
+            if len(text) < 2048 and not any(c.isspace() for c in text.strip()) and is_remote_media(url):
+                self.download_media(url.toString())
+
+    def show_copied_image(self, image, digest=None):
+        self.previous_image = image
+        self.previous_image_digest = digest
+        self.copied_text_display.update_image(image)
+        self.history.add_image(image)
+        self.store.add_image(partial(png_bytes, image))
 
-    def download_gif(self, url):
+    def on_image_digest(self, job_id, digest, previous_digest):
+        if self.digest_job is None or job_id != self.digest_job.job_id:
+            return
+        image = self.digest_job.image
+        self.digest_job = None
+        if previous_digest is not None:
+            self.previous_image_digest = previous_digest
+        if digest == self.previous_image_digest:
+            self.skipped_changes += 1
+            return
         try:
-            request = QNetworkRequest(QtCore.QUrl(url))
-            self.network_manager.get(request)
+            self.show_copied_image(image, digest)
         except Exception as e:
-            print("Error downloading GIF:", e)
+            print("Error processing image:", e)
+
+    def show_selection(self, paths):
+        """Preview copied files or a folder and total them up in the background"""
+        self.cancel_walk()
+        self.walk_job = SelectionWalker(paths, next(self.walk_ids))
+        self.walk_job.signals.progress.connect(self.on_walk_progress)
+        self.copied_text_display.update_text(format_selection(self.walk_job.snapshot(), False))
+        self.walk_pool.start(self.walk_job)
+
+    def cancel_walk(self):
+        if self.walk_job is not None:
+            self.walk_job.cancelled = True
+            self.walk_job = None
 
-    def on_download_finished(self, reply):
-        if reply.error():
-            print("Error downloading GIF:", reply.errorString())
+    def on_walk_progress(self, job_id, summary, done):
+        if self.walk_job is None or job_id != self.walk_job.job_id:
             return
+        if done:
+            self.walk_job = None
+        self.copied_text_display.update_text(format_selection(summary, done))
+
+    def show_history_entry(self, entry):
+        """Preview an item picked from the history panel"""
+        self.history.touch(entry)
+        self.forget_clipboard_content()
+        if entry.payload is None:
+            # The full payload was evicted; the thumbnail is all that is left
+            if entry.thumbnail is not None:
+                self.copied_text_display.update_image(entry.thumbnail)
+            else:
+                self.copied_text_display.update_text(entry.summary)
+        elif entry.kind == "text":
+            self.copied_text_display.update_text(entry.payload)
+        else:
+            self.copied_text_display.update_image(entry.payload, is_gif=entry.kind == "gif")
+
+    def toggle_history(self):
+        if self.history_panel.isVisible():
+            self.history_panel.hide()
+        else:
+            self.history_panel.show_beside(self.copied_text_display)
+
+    def download_media(self, url):
+        self.current_media_url = url
+        self.media_loader.fetch(url)
+
+    def on_media_loaded(self, url, data, is_gif):
+        if url != self.current_media_url:
+            return
+        self.current_media_url = None
         try:
-            data = reply.readAll()
-            self.update_image(data, is_gif=True)
-            image = QtGui.QImage()
-            image.loadFromData(data)
-            self.copied_text_display.update_image(image, is_gif=True)
+            self.copied_text_display.update_image(data, is_gif=is_gif)
         except Exception as e:
-            print("Error processing downloaded GIF:", e)
+            print("Error processing downloaded image:", e)
+
+    def on_media_failed(self, url, error):
+        print("Error downloading image:", url, error)
 
     def show_bubble(self):
         cursor_pos = QtGui.QCursor.pos()
@@ -119,11 +834,102 @@ class ClipboardWatcher(QtWidgets.QWidget):
     def hide_bubble(self):
         self.hide()
 
+def stored_entry(item):
+    """HistoryEntry for an item found in the HistoryStore"""
+    if item["kind"] in ("image", "gif") and item["path"]:
+        summary = os.path.basename(item["text"]) or "Image"
+        return HistoryEntry(item["kind"], summary, item["path"], 0)
+    prefixes = {"file": "File: ", "folder": "Folder: ", "url": "URL: "}
+    text = prefixes.get(item["kind"], "") + item["text"]
+    return HistoryEntry("text", " ".join(text[:200].split())[:80], text, 0)
+
+class ClipboardHistoryPanel(QtWidgets.QWidget):
+    def __init__(self, history, on_select, store=None):
+        super().__init__()
+        self.history = history
+        self.on_select = on_select
+        self.store = store
+        self.shown_entries = []
+        self.initUI()
+        self.history.changed.connect(self.refresh)
+
+    def initUI(self):
+        self.setWindowFlags(QtCore.Qt.FramelessWindowHint | QtCore.Qt.WindowStaysOnTopHint | QtCore.Qt.Tool)
+        self.setAttribute(QtCore.Qt.WA_TranslucentBackground)
+        self.layout = QtWidgets.QVBoxLayout(self)
+        self.layout.setContentsMargins(0, 0, 0, 0)
+
+        self.search = QtWidgets.QLineEdit(self)
+        self.search.setPlaceholderText("Search all history...")
+        self.search.setStyleSheet("""
+            QLineEdit {
+                color: white;
+                background-color: rgba(0, 0, 0, 150);
+                border: 1px solid white;
+                border-radius: 10px;
+                padding: 2px 6px;
+            }
+        """)
+        self.search.textChanged.connect(self.refresh)
+        if self.store is None:
+            self.search.hide()
+        self.layout.addWidget(self.search)
+
+        self.list = QtWidgets.QListWidget(self)
+        self.list.setIconSize(QtCore.QSize(THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+        self.list.setStyleSheet("""
+            QListWidget {
+                color: white;
+                background-color: rgba(0, 0, 0, 150);
+                border: 1px solid white;
+                border-radius: 10px;
+            }
+        """)
+        self.list.itemClicked.connect(self.on_item_clicked)
+        self.layout.addWidget(self.list)
+        self.setFixedSize(250, 300)
+        self.hide()
+
+    def refresh(self):
+        """Rebuild the list, newest first; skipped while the panel is hidden.
+
+        With a search query, matches come from the on-disk store instead of
+        the in-memory ring.
+        """
+        if not self.isVisible():
+            return
+        self.list.clear()
+        query = self.search.text()
+        if self.store is not None and query.strip():
+            self.shown_entries = [stored_entry(item) for item in self.store.search(query)]
+        else:
+            self.shown_entries = list(reversed(self.history.entries))
+        for entry in self.shown_entries:
+            item = QtWidgets.QListWidgetItem(entry.summary)
+            if entry.thumbnail is not None:
+                item.setIcon(QtGui.QIcon(QPixmap.fromImage(entry.thumbnail)))
+            self.list.addItem(item)
+
+    def on_item_clicked(self, item):
+        self.on_select(self.shown_entries[self.list.row(item)])
+
+    def show_beside(self, widget):
+        self.show()
+        self.refresh()
+        self.move(widget.x() - self.width() - 10, widget.y() + widget.height() - self.height())
+
 class CopiedTextDisplay(QtWidgets.QWidget):
     def __init__(self):
         super().__init__()
-        self.movie = None
-        self.is_frame_changed_connected = False
+        self.gif_player = None
+        self.thumbnails = ThumbnailCache()
+        self.scale_job = None
+        self.scale_generation = 0
+        self.large_text = None
+        self.chunk_bounds = []
+        self.chunk_lengths = deque()
+        self.first_chunk = 0
+        self.paging = False
         self.fixed_width = 250  
         self.fixed_height = 150  
         self.clear_button_height = 20  
@@ -171,12 +977,24 @@ class CopiedTextDisplay(QtWidgets.QWidget):
             """)
             self.textArea.setReadOnly(True)
             self.textArea.hide()
+            self.textArea.verticalScrollBar().valueChanged.connect(self.on_text_scrolled)
             self.layout.addWidget(self.textArea, 1)  
+
+            self.textInfo = QtWidgets.QLabel(self)
+            self.textInfo.setStyleSheet("QLabel { color: white; background-color: rgba(0, 0, 0, 150); }")
+            self.textInfo.hide()
+            self.layout.addWidget(self.textInfo)
           
+            self.buttonRow = QtWidgets.QHBoxLayout()
+            self.buttonRow.setSpacing(0)
             self.clearButton = QtWidgets.QPushButton("Clear", self)
             self.clearButton.clicked.connect(self.clear_contents)
             self.clearButton.setFixedHeight(self.clear_button_height)
-            self.layout.addWidget(self.clearButton)
+            self.buttonRow.addWidget(self.clearButton)
+            self.historyButton = QtWidgets.QPushButton("History", self)
+            self.historyButton.setFixedHeight(self.clear_button_height)
+            self.buttonRow.addWidget(self.historyButton)
+            self.layout.addLayout(self.buttonRow)
 
             self.setFixedSize(self.fixed_width, self.fixed_height + self.clear_button_height)
             self.hide()
@@ -184,50 +1002,80 @@ class CopiedTextDisplay(QtWidgets.QWidget):
             print("Error initializing UI:", e)
     
     def update_image(self, image, is_gif=False):
+        self.cancel_scale_job()
+        if not is_gif:
+            # A file copied before has its preview cached and shows at once
+            if isinstance(image, str):
+                cached = self.thumbnails.load(image, self.fixed_width, self.fixed_height)
+                if cached is not None:
+                    self.show_scaled_image(cached)
+                    return
+            # Decode and scale off the GUI thread; the current content
+            # stays up until on_image_scaled receives the result
+            self.scale_job = ImageScaleJob(
+                image, self.fixed_width, self.fixed_height, self.scale_generation, self.thumbnails
+            )
+            self.scale_job.signals.finished.connect(self.on_image_scaled)
+            QtCore.QThreadPool.globalInstance().start(self.scale_job)
+            return
+
         self.textArea.hide()
         self.display_label.hide()
         self.gif_label.hide()
+        self.stop_movie()
 
-        if self.movie and self.is_frame_changed_connected:
-            self.movie.frameChanged.disconnect(self.resize_to_gif)
-            self.movie.stop()
-            self.movie.deleteLater()
-            self.movie = None
-            self.is_frame_changed_connected = False
-
-        if is_gif:
-            self.movie = QMovie(image)
-            self.movie.setCacheMode(QMovie.CacheAll)
-            self.movie.frameChanged.connect(self.resize_to_gif)
-            self.is_frame_changed_connected = True
-
-            self.gif_label.setMovie(self.movie)
-            self.movie.start()
-            self.gif_label.show()
+        # Only the header is read here, to size and place the label once
+        # per movie rather than on every frame
+        size = image_reader(image).size()
+        if size.isValid():
+            size = size.scaled(self.fixed_width, self.fixed_height, QtCore.Qt.KeepAspectRatio)
         else:
-            if isinstance(image, str):
-                pixmap = QPixmap(image)
-            else:
-                pixmap = QPixmap.fromImage(image)
-
-            scaled_pixmap = pixmap.scaled(self.fixed_width, self.fixed_height, QtCore.Qt.KeepAspectRatio)
-            self.display_label.setPixmap(scaled_pixmap)
-            self.display_label.setFixedSize(scaled_pixmap.size())
-            self.display_label.show()
+            size = QtCore.QSize(self.fixed_width, self.fixed_height)
+        self.gif_player = GifPlayer(image, size, parent=self)
+        self.gif_player.frameReady.connect(self.gif_label.setPixmap)
+        self.gif_label.setFixedSize(size)
+        self.gif_label.show()
 
         self.show()
+        self.centerContent()
         self.adjustSizeAndPosition()
+        self.gif_player.start()
 
-    def resize_to_gif(self, frame_number):
-        if not self.movie or not self.is_frame_changed_connected:
+    def cancel_scale_job(self):
+        """Drop any image still being decoded; only the newest item is shown"""
+        self.scale_generation += 1
+        if self.scale_job is not None:
+            self.scale_job.cancelled = True
+            try:
+                QtCore.QThreadPool.globalInstance().tryTake(self.scale_job)
+            except RuntimeError:
+                pass  # Already ran and was deleted by the pool
+            self.scale_job = None
+
+    def on_image_scaled(self, generation, scaled_image):
+        if generation != self.scale_generation:
             return
+        self.scale_job = None
+        self.show_scaled_image(scaled_image)
 
-        current_frame = self.movie.currentPixmap()
-        scaled_frame = current_frame.scaled(self.fixed_width, self.fixed_height, QtCore.Qt.KeepAspectRatio)
-        self.gif_label.setPixmap(scaled_frame)
-        self.gif_label.setFixedSize(scaled_frame.size())
+    def show_scaled_image(self, scaled_image):
+        self.textArea.hide()
+        self.gif_label.hide()
+        self.stop_movie()
 
-        self.centerContent()
+        scaled_pixmap = QPixmap.fromImage(scaled_image)
+        self.display_label.setPixmap(scaled_pixmap)
+        self.display_label.setFixedSize(scaled_pixmap.size())
+        self.display_label.show()
+
+        self.show()
+        self.adjustSizeAndPosition()
+
+    def stop_movie(self):
+        if self.gif_player is not None:
+            self.gif_player.stop()
+            self.gif_player.deleteLater()
+            self.gif_player = None
 
     def centerContent(self):
         content_width = self.gif_label.width() if self.gif_label.isVisible() else self.display_label.width()
@@ -242,18 +1090,17 @@ class CopiedTextDisplay(QtWidgets.QWidget):
             self.display_label.move(label_x, label_y)
 
     def update_text(self, text):
+        self.cancel_scale_job()
         self.display_label.hide()
         self.gif_label.hide()
-        
-        if self.movie:
-            self.movie.stop()
-            if self.is_frame_changed_connected:
-                self.movie.frameChanged.disconnect(self.resize_to_gif)
-                self.is_frame_changed_connected = False
-            self.movie.deleteLater() 
-            self.movie = None
+        self.stop_movie()
 
-        self.textArea.setText(text)
+        if len(text) > LARGE_TEXT_CHARS:
+            self.show_large_text(text)
+        else:
+            self.large_text = None
+            self.textInfo.hide()
+            self.textArea.setText(text)
         self.textArea.show()
 
         self.setFixedSize(self.fixed_width, self.fixed_height + self.clear_button_height)
@@ -261,20 +1108,90 @@ class CopiedTextDisplay(QtWidgets.QWidget):
         self.show()
         self.adjustSizeAndPosition()
 
+    def show_large_text(self, text):
+        """Show the first chunk now and page the rest in as the user scrolls.
+
+        Only a window of TEXT_WINDOW_CHUNKS chunks is kept in the document;
+        chunks are dropped from the far end as new ones are loaded.
+        """
+        self.large_text = text
+        self.chunk_bounds = [0, chunk_end(text, 0)]
+        self.chunk_lengths = deque()
+        self.first_chunk = 0
+        lines = text.count("\n") + (not text.endswith("\n"))
+        self.textInfo.setText(f"{len(text):,} characters, {lines:,} lines")
+        self.textInfo.show()
+        self.paging = True
+        self.textArea.clear()
+        self.insert_chunk(0, at_end=True)
+        self.textArea.verticalScrollBar().setValue(0)
+        self.paging = False
+
+    def insert_chunk(self, index, at_end):
+        document = self.textArea.document()
+        before = document.characterCount()
+        cursor = QtGui.QTextCursor(document)
+        cursor.movePosition(QtGui.QTextCursor.End if at_end else QtGui.QTextCursor.Start)
+        cursor.insertText(self.large_text[self.chunk_bounds[index]:self.chunk_bounds[index + 1]])
+        # Measured in document positions, which is what remove_chunk needs
+        length = document.characterCount() - before
+        if at_end:
+            self.chunk_lengths.append(length)
+        else:
+            self.chunk_lengths.appendleft(length)
+
+    def remove_chunk(self, at_end):
+        document = self.textArea.document()
+        cursor = QtGui.QTextCursor(document)
+        if at_end:
+            end = document.characterCount() - 1
+            cursor.setPosition(end - self.chunk_lengths.pop())
+            cursor.setPosition(end, QtGui.QTextCursor.KeepAnchor)
+        else:
+            cursor.setPosition(0)
+            cursor.setPosition(self.chunk_lengths.popleft(), QtGui.QTextCursor.KeepAnchor)
+        cursor.removeSelectedText()
+
+    def on_text_scrolled(self, value):
+        if self.large_text is None or self.paging:
+            return
+        bar = self.textArea.verticalScrollBar()
+        self.paging = True
+        try:
+            last = self.first_chunk + len(self.chunk_lengths)
+            if value >= bar.maximum() - bar.pageStep():
+                if last == len(self.chunk_bounds) - 1 and self.chunk_bounds[-1] < len(self.large_text):
+                    self.chunk_bounds.append(chunk_end(self.large_text, self.chunk_bounds[-1]))
+                if last < len(self.chunk_bounds) - 1:
+                    self.insert_chunk(last, at_end=True)
+                    if len(self.chunk_lengths) > TEXT_WINDOW_CHUNKS:
+                        # Keep the view still while the top chunk goes away
+                        maximum = bar.maximum()
+                        self.remove_chunk(at_end=False)
+                        self.first_chunk += 1
+                        bar.setValue(value - (maximum - bar.maximum()))
+            elif value <= bar.pageStep() and self.first_chunk > 0:
+                maximum = bar.maximum()
+                self.first_chunk -= 1
+                self.insert_chunk(self.first_chunk, at_end=False)
+                bar.setValue(value + (bar.maximum() - maximum))
+                if len(self.chunk_lengths) > TEXT_WINDOW_CHUNKS:
+                    self.remove_chunk(at_end=True)
+        finally:
+            self.paging = False
+
     def clear_contents(self):
-        if self.movie and self.is_frame_changed_connected:
-            self.movie.frameChanged.disconnect(self.resize_to_gif)
-            self.movie.stop()
-            self.movie.deleteLater()
-            self.movie = None
-            self.is_frame_changed_connected = False
+        self.cancel_scale_job()
+        self.stop_movie()
 
         self.display_label.clear()
         self.display_label.hide()
         self.gif_label.clear()
         self.gif_label.hide()
+        self.large_text = None
         self.textArea.clear()
         self.textArea.hide()
+        self.textInfo.hide()
 
         self.hide()
 
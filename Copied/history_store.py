@@ -0,0 +1,274 @@
+"""On-disk clipboard history for Copied.
+
+Items live in a SQLite database with an FTS5 index over their text.
+Images and copied files are stored once under blobs/, named by the
+SHA-256 of their contents, so copying the same thing again only adds a
+row. Writes are queued and committed in batches on a background thread,
+so capturing a copy never waits for the disk. After each batch the
+oldest items are deleted once there are more than max_items, or once
+their blobs take more than max_blob_bytes. The module has no Qt
+dependency and can be used on its own:
+
+    store = HistoryStore("/tmp/history")
+    store.add_text("hello world")
+    store.flush()
+    store.search("hel")
+"""
+import hashlib
+import os
+import queue
+import sqlite3
+import tempfile
+import threading
+import time
+
+STORE_DIR = os.path.join(os.path.expanduser("~"), ".copied")
+DATABASE_NAME = "history.db"
+BLOBS_NAME = "blobs"
+BATCH_SIZE = 200  # Items committed per transaction
+MAX_FILE_BYTES = 50 * 1024 * 1024  # Larger files are recorded by path only
+SEARCH_LIMIT = 50
+MAX_ITEMS = 50000
+MAX_BLOB_BYTES = 500 * 1024 * 1024
+
+def fts_query(query):
+    """Every word as a quoted prefix term, so results narrow while typing"""
+    words = query.replace('"', " ").split()
+    return " ".join(f'"{word}"*' for word in words)
+
+class HistoryStore:
+    def __init__(self, directory=STORE_DIR, batch_size=BATCH_SIZE,
+                 max_items=MAX_ITEMS, max_blob_bytes=MAX_BLOB_BYTES):
+        self.directory = directory
+        self.database_path = os.path.join(directory, DATABASE_NAME)
+        self.blobs_path = os.path.join(directory, BLOBS_NAME)
+        self.batch_size = batch_size
+        self.max_items = max_items
+        self.max_blob_bytes = max_blob_bytes
+        os.makedirs(self.blobs_path, exist_ok=True)
+
+        # Reads happen on the caller's thread; the writer has its own connection
+        self.connection = self.connect()
+        self.fts = self.create_schema(self.connection)
+        self.queue = queue.Queue()
+        self.writer = threading.Thread(target=self.run_writer, daemon=True)
+        self.writer.start()
+
+    def connect(self):
+        connection = sqlite3.connect(self.database_path, check_same_thread=False)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def create_schema(self, connection):
+        """Create the tables; returns False when SQLite was built without FTS5"""
+        with connection:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS items (
+                    id INTEGER PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    text TEXT NOT NULL DEFAULT '',
+                    blob TEXT,
+                    size INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            connection.execute("CREATE INDEX IF NOT EXISTS items_blob ON items (blob)")
+            try:
+                connection.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS items_fts "
+                    "USING fts5(text, content='items', content_rowid='id')"
+                )
+            except sqlite3.OperationalError:
+                return False
+        return True
+
+    def add_text(self, text, kind="text"):
+        self.queue.put(("text", kind, time.time(), text))
+
+    def add_image(self, data, kind="image"):
+        """Queue image bytes, or a callable returning them that runs on the writer thread"""
+        self.queue.put(("data", kind, time.time(), data))
+
+    def add_file(self, path, kind="file"):
+        """Queue a copy of a file's contents; its path is kept as searchable text"""
+        self.queue.put(("file", kind, time.time(), path))
+
+    def run_writer(self):
+        connection = self.connect()
+        while True:
+            items = [self.queue.get()]
+            while len(items) < self.batch_size:
+                try:
+                    items.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in items
+            try:
+                rows = [row for row in map(self.prepare_row, items) if row is not None]
+                if rows:
+                    self.insert_rows(connection, rows)
+                    self.remove_blobs(self.prune(connection))
+            except Exception as e:
+                print("Error saving clipboard history:", e)
+            for _ in items:
+                self.queue.task_done()
+            if stop:
+                connection.close()
+                return
+
+    def prepare_row(self, item):
+        """Turn a queued item into (kind, created, text, blob, size), writing its blob"""
+        if item is None:
+            return None
+        source, kind, created, value = item
+        try:
+            if source == "text":
+                return kind, created, value, None, len(value)
+            if source == "data":
+                data = value() if callable(value) else value
+                return kind, created, "", self.write_blob(data), len(data)
+            size = os.path.getsize(value)
+            blob = self.copy_file_blob(value) if size <= MAX_FILE_BYTES else None
+            return kind, created, value, blob, size
+        except (OSError, ValueError) as e:
+            print("Error storing clipboard item:", e)
+            return None
+
+    def insert_rows(self, connection, rows):
+        with connection:
+            for row in rows:
+                cursor = connection.execute(
+                    "INSERT INTO items (kind, created, text, blob, size) VALUES (?, ?, ?, ?, ?)", row
+                )
+                if self.fts and row[2]:
+                    connection.execute(
+                        "INSERT INTO items_fts (rowid, text) VALUES (?, ?)", (cursor.lastrowid, row[2])
+                    )
+
+    def prune(self, connection):
+        """Delete the oldest items over the limits; returns blobs no item uses any more"""
+        with connection:
+            doomed = connection.execute(
+                "SELECT id, text, blob FROM items ORDER BY id DESC LIMIT -1 OFFSET ?", (self.max_items,)
+            ).fetchall()
+            self.delete_items(connection, doomed)
+            unused = {blob for _, _, blob in doomed if blob and not self.blob_used(connection, blob)}
+
+            blob_bytes = connection.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM (SELECT MAX(size) AS size FROM items "
+                "WHERE blob IS NOT NULL GROUP BY blob)"
+            ).fetchone()[0]
+            if blob_bytes <= self.max_blob_bytes:
+                return unused
+            oldest = connection.execute(
+                "SELECT id, text, blob, size FROM items WHERE blob IS NOT NULL ORDER BY id"
+            )
+            for item_id, text, blob, size in oldest.fetchall():
+                self.delete_items(connection, [(item_id, text, blob)])
+                if not self.blob_used(connection, blob):
+                    unused.add(blob)
+                    blob_bytes -= size
+                    if blob_bytes <= self.max_blob_bytes:
+                        break
+        return unused
+
+    def delete_items(self, connection, items):
+        for item_id, text, _ in items:
+            connection.execute("DELETE FROM items WHERE id = ?", (item_id,))
+            if self.fts and text:
+                # items_fts reads the text from items, so it has to be passed back to delete it
+                connection.execute(
+                    "INSERT INTO items_fts (items_fts, rowid, text) VALUES ('delete', ?, ?)", (item_id, text)
+                )
+
+    def blob_used(self, connection, blob):
+        return connection.execute("SELECT 1 FROM items WHERE blob = ? LIMIT 1", (blob,)).fetchone() is not None
+
+    def remove_blobs(self, blobs):
+        for blob in blobs:
+            try:
+                os.remove(self.blob_path(blob))
+            except OSError as e:
+                print("Error removing clipboard blob:", e)
+
+    def blob_path(self, digest):
+        return os.path.join(self.blobs_path, digest[:2], digest)
+
+    def write_blob(self, data):
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return digest
+
+    def copy_file_blob(self, path):
+        """Hash while copying to a temporary file, then keep it only if new"""
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self.blobs_path, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as target, open(path, "rb") as source:
+                for chunk in iter(lambda: source.read(1024 * 1024), b""):
+                    digest.update(chunk)
+                    target.write(chunk)
+            name = digest.hexdigest()
+            blob = self.blob_path(name)
+            if os.path.exists(blob):
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(blob), exist_ok=True)
+                os.replace(tmp_path, blob)
+            return name
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def row_to_item(self, row):
+        item = dict(row)
+        item["path"] = self.blob_path(item["blob"]) if item["blob"] else None
+        return item
+
+    def recent(self, limit=SEARCH_LIMIT):
+        rows = self.connection.execute(
+            "SELECT id, kind, created, text, blob, size FROM items ORDER BY id DESC LIMIT ?", (limit,)
+        )
+        return [self.row_to_item(row) for row in rows]
+
+    def search(self, query, limit=SEARCH_LIMIT):
+        """Newest items whose text contains every word of query as a prefix"""
+        if not query.split():
+            return self.recent(limit)
+        if self.fts:
+            rows = self.connection.execute("""
+                SELECT items.id, kind, created, items.text, blob, size
+                FROM items_fts JOIN items ON items.id = items_fts.rowid
+                WHERE items_fts MATCH ?
+                ORDER BY items_fts.rowid DESC
+                LIMIT ?
+            """, (fts_query(query), limit))
+        else:
+            rows = self.connection.execute(
+                "SELECT id, kind, created, text, blob, size FROM items "
+                "WHERE text LIKE ? ORDER BY id DESC LIMIT ?",
+                (f"%{query}%", limit)
+            )
+        return [self.row_to_item(row) for row in rows]
+
+    def count(self):
+        return self.connection.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+    def flush(self):
+        """Wait until everything queued so far is on disk"""
+        self.queue.join()
+
+    def close(self):
+        if self.writer.is_alive():
+            self.queue.put(None)
+            self.writer.join()
+        self.connection.close()
@@ -0,0 +1,84 @@
+"""RemoteMediaLoader against a local HTTP stand-in for an image host"""
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from PyQt5 import QtCore
+from PyQt5.QtNetwork import QNetworkAccessManager
+
+from Copied import RemoteMediaLoader
+
+IMAGE = b"GIF89a" + bytes(64)
+
+class ImageHost(BaseHTTPRequestHandler):
+    cache_control = "max-age=0"
+    requests = []
+
+    def do_GET(self):
+        self.requests.append(self.headers.get("If-None-Match"))
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.send_header("ETag", '"v1"')
+            self.send_header("Cache-Control", self.cache_control)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "image/gif")
+        self.send_header("Content-Length", str(len(IMAGE)))
+        self.send_header("ETag", '"v1"')
+        self.send_header("Cache-Control", self.cache_control)
+        self.end_headers()
+        self.wfile.write(IMAGE)
+
+    def log_message(self, *args):
+        pass
+
+class RemoteMediaLoaderTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+
+    def setUp(self):
+        ImageHost.requests = []
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), ImageHost)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/image.gif"
+
+    def fetch(self):
+        """Load the image with a fresh manager over the same disk cache"""
+        manager = QNetworkAccessManager()
+        loader = RemoteMediaLoader(manager, self.cache_dir)
+        results = []
+        loop = QtCore.QEventLoop()
+        loader.loaded.connect(lambda url, data, is_gif: results.append((bytes(data), is_gif)))
+        loader.failed.connect(lambda url, error: results.append(error))
+        loader.loaded.connect(loop.quit)
+        loader.failed.connect(loop.quit)
+        QtCore.QTimer.singleShot(5000, loop.quit)
+        loader.fetch(self.url)
+        loop.exec_()
+        return results
+
+    def test_stale_copy_is_revalidated(self):
+        ImageHost.cache_control = "max-age=0"
+        self.assertEqual(self.fetch(), [(IMAGE, True)])
+        # Qt counts a copy as stale once its expiry is a whole second ago
+        time.sleep(1.1)
+        self.assertEqual(self.fetch(), [(IMAGE, True)])
+        self.assertEqual(ImageHost.requests, [None, '"v1"'])
+
+    def test_fresh_copy_is_read_from_disk(self):
+        ImageHost.cache_control = "max-age=3600"
+        self.assertEqual(self.fetch(), [(IMAGE, True)])
+        self.assertEqual(self.fetch(), [(IMAGE, True)])
+        self.assertEqual(ImageHost.requests, [None])
+
+if __name__ == "__main__":
+    unittest.main()
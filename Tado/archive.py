@@ -0,0 +1,103 @@
+"""Compressed, append-only archive for completed Tado tasks.
+
+Each archiving run appends one gzip member of NDJSON records to
+tasks.archive.gz; gzip readers treat the concatenated members as one
+stream. The archive is only opened when archiving or when it is viewed,
+and it is read page by page. A member torn by a crash mid-append is
+skipped when reading, along with anything up to the next member header,
+so the members appended after it stay readable.
+"""
+import gzip
+import json
+import os
+import zlib
+from itertools import islice
+
+ARCHIVE_PATH = "tasks.archive.gz"
+ARCHIVE_AFTER_DAYS = 7  # Completed tasks older than this leave the working set
+PAGE_SIZE = 50
+GZIP_MAGIC = b"\x1f\x8b\x08"
+READ_SIZE = 64 * 1024
+
+def find_member(f, offset):
+    """Offset of the next gzip member header at or after offset, or None"""
+    f.seek(offset)
+    tail = b""
+    while True:
+        chunk = f.read(READ_SIZE)
+        if not chunk:
+            return None
+        data = tail + chunk
+        idx = data.find(GZIP_MAGIC)
+        if idx >= 0:
+            return offset - len(tail) + idx
+        tail = data[-(len(GZIP_MAGIC) - 1):]
+        offset += len(chunk)
+
+def member_lines(f):
+    """Yield the complete lines of every readable gzip member in f"""
+    start = 0
+    while start is not None:
+        f.seek(start)
+        decompressor = zlib.decompressobj(wbits=31)
+        position = start
+        text = b""
+        data = f.read(READ_SIZE)
+        if not data:
+            return
+        try:
+            while True:
+                position += len(data)
+                text += decompressor.decompress(data)
+                *lines, text = text.split(b"\n")
+                yield from lines
+                if decompressor.eof:
+                    break
+                data = f.read(READ_SIZE)
+                if not data:
+                    # The last member was torn; its partial line is dropped
+                    return
+        except zlib.error:
+            start = find_member(f, start + 1)
+            continue
+        start = position - len(decompressor.unused_data)
+
+class TaskArchive:
+    def __init__(self, path=ARCHIVE_PATH):
+        self.path = path
+
+    def append(self, day, tasks, archived_at):
+        """Add tasks from one day to the end of the archive"""
+        lines = "".join(
+            json.dumps({
+                "day": day,
+                "id": task["id"],
+                "text": task["text"],
+                "completed_at": task.get("completed_at"),
+                "archived_at": archived_at
+            }) + "\n"
+            for task in tasks
+        )
+        with gzip.open(self.path, "at", encoding="utf-8") as f:
+            f.write(lines)
+
+    def records(self):
+        """Yield archived records, oldest first, without reading ahead"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            for line in member_lines(f):
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # Left over from a torn member
+                    continue
+
+    def pages(self, page_size=PAGE_SIZE):
+        """Yield lists of at most page_size records, reading only as far as needed"""
+        records = self.records()
+        while True:
+            page = list(islice(records, page_size))
+            if not page:
+                return
+            yield page
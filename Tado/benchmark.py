@@ -0,0 +1,144 @@
+"""Headless benchmarks for TaskStore operations.
+
+Times add, toggle, edit, save and load against days holding 10, 1k, 10k
+and 100k tasks with both storage backends, and records peak Python memory
+for each operation. Results are printed (or written) as JSON so two runs
+can be compared with --compare.
+
+    python benchmark.py --output before.json
+    python benchmark.py --compare before.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from storage import JournalStorage, SQLiteStorage, new_task_id
+from task_store import DAYS, TaskStore
+
+SIZES = [10, 1_000, 10_000, 100_000]
+BACKENDS = ["json", "sqlite"]
+REPEAT = 20
+
+def open_storage(backend, directory):
+    snapshot = os.path.join(directory, "tasks.json")
+    journal = os.path.join(directory, "tasks.journal")
+    if backend == "sqlite":
+        return SQLiteStorage(os.path.join(directory, "tasks.db"), snapshot, journal)
+    # No coalescing delay, so save measures the write itself
+    return JournalStorage(snapshot, journal, flush_window=0)
+
+def seed(directory, size):
+    """Write a tasks.json with `size` tasks on Monday"""
+    tasks = {day: [] for day in DAYS}
+    tasks["MONDAY"] = [
+        {"id": new_task_id(), "text": f"Task {i}", "completed": i % 3 == 0}
+        for i in range(size)
+    ]
+    with open(os.path.join(directory, "tasks.json"), "w") as f:
+        json.dump({"tasks": tasks, "weather": {"temperature": "", "last_update": ""}}, f)
+
+def open_store(backend, directory):
+    store = TaskStore(open_storage(backend, directory))
+    store.load()
+    store.tasks["MONDAY"]
+    store.flush()
+    return store
+
+def operations(store, backend, directory):
+    """Map operation name -> callable performing it once"""
+    day = "MONDAY"
+    middle = len(store.tasks[day]) // 2
+
+    def load():
+        other = open_store(backend, directory)
+        other.close()
+
+    def save():
+        store.save()
+        store.flush()
+
+    return {
+        "add": lambda: store.add_task(day, "Benchmark task"),
+        "toggle": lambda: store.toggle_task(day, middle),
+        "edit": lambda: store.edit_task(day, middle, "Edited task"),
+        "save": save,
+        "load": load,
+    }
+
+def measure(operation, repeat):
+    """Median wall time over `repeat` calls, then peak memory of one call"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        operation()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    operation()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings), peak
+
+def run(sizes=SIZES, backends=BACKENDS, repeat=REPEAT):
+    results = []
+    for backend in backends:
+        for size in sizes:
+            with tempfile.TemporaryDirectory() as directory:
+                seed(directory, size)
+                store = open_store(backend, directory)
+                for name, operation in operations(store, backend, directory).items():
+                    # Loading and saving large days is slow; a few samples suffice
+                    samples = repeat if name not in ("save", "load") else max(3, repeat // 5)
+                    seconds, peak = measure(operation, samples)
+                    store.flush()
+                    results.append({
+                        "backend": backend,
+                        "size": size,
+                        "operation": name,
+                        "seconds": seconds,
+                        "peak_bytes": peak,
+                        "repeat": samples,
+                    })
+                    print(f"{backend:>6} {size:>7} {name:<6} {seconds * 1000:10.3f} ms "
+                          f"{peak / 1024:10.1f} KiB", file=sys.stderr)
+                store.close()
+    return results
+
+def compare(previous, current):
+    """Print the time and memory ratio of each result against a previous run"""
+    baseline = {(r["backend"], r["size"], r["operation"]): r for r in previous}
+    for result in current:
+        old = baseline.get((result["backend"], result["size"], result["operation"]))
+        if not old:
+            continue
+        time_ratio = result["seconds"] / old["seconds"] if old["seconds"] else float("inf")
+        memory_ratio = result["peak_bytes"] / old["peak_bytes"] if old["peak_bytes"] else float("inf")
+        print(f"{result['backend']:>6} {result['size']:>7} {result['operation']:<6} "
+              f"time x{time_ratio:.2f}  memory x{memory_ratio:.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark Tado task operations")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=BACKENDS)
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--output", help="write JSON results here instead of stdout")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.backends, args.repeat)
+    report = {"python": sys.version.split()[0], "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f)["results"], results)
@@ -0,0 +1,112 @@
+"""Streaming import and export of Tado tasks as NDJSON or CSV.
+
+Files are read one record at a time and committed to the TaskStore in
+batches, so memory stays bounded by BATCH_SIZE however long the file is.
+
+    python bulk.py import checklist.csv --day FRIDAY
+    python bulk.py export backup.ndjson
+"""
+import argparse
+import csv
+import json
+import os
+from itertools import islice
+
+from storage import DATABASE_PATH, JournalStorage, SQLiteStorage
+from task_store import DAYS, TaskStore
+
+BATCH_SIZE = 1000
+FIELDS = ["day", "text", "completed"]
+
+def detect_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return "csv"
+    if extension in (".ndjson", ".jsonl"):
+        return "ndjson"
+    raise ValueError(f"Unknown task file format: {path}")
+
+def parse_completed(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "y", "x", "done")
+    return bool(value)
+
+def iter_records(path, fmt=None, default_day=DAYS[0]):
+    """Yield (day, text, completed) tuples without reading the whole file"""
+    fmt = fmt or detect_format(path)
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        for row in rows:
+            if isinstance(row, str):
+                row = {"text": row}
+            day = (row.get("day") or default_day).strip().upper()
+            if day not in DAYS:
+                day = default_day
+            yield day, row.get("text") or "", parse_completed(row.get("completed", False))
+
+def import_batches(store, path, fmt=None, default_day=DAYS[0], batch_size=BATCH_SIZE):
+    """Commit a file to the store batch by batch, yielding each batch's size.
+
+    The store writes one full snapshot after the last batch instead of
+    saving after every task.
+    """
+    records = iter_records(path, fmt, default_day)
+    try:
+        while True:
+            batch = list(islice(records, batch_size))
+            if not batch:
+                break
+            yield store.add_tasks(batch)
+    finally:
+        store.save()
+
+def import_tasks(store, path, fmt=None, default_day=DAYS[0], batch_size=BATCH_SIZE):
+    """Import a whole file and return the number of tasks added"""
+    return sum(import_batches(store, path, fmt, default_day, batch_size))
+
+def export_tasks(store, path, fmt=None):
+    """Write every task, day by day, and return the number written"""
+    fmt = fmt or detect_format(path)
+    written = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS) if fmt == "csv" else None
+        if writer:
+            writer.writeheader()
+        for day in store.days:
+            for task in store.tasks[day]:
+                record = {"day": day, "text": task["text"], "completed": task["completed"]}
+                if writer:
+                    writer.writerow(record)
+                else:
+                    f.write(json.dumps(record) + "\n")
+                written += 1
+    return written
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import or export Tado tasks")
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("path", help=".ndjson/.jsonl or .csv file")
+    parser.add_argument("--format", choices=["ndjson", "csv"], help="override the format detected from the extension")
+    parser.add_argument("--day", default=DAYS[0], type=str.upper, choices=DAYS,
+                        help="day for records that do not name one")
+    parser.add_argument(
+        "--storage",
+        choices=["json", "sqlite"],
+        default="sqlite" if os.path.exists(DATABASE_PATH) else "json"
+    )
+    args = parser.parse_args()
+
+    store = TaskStore(SQLiteStorage() if args.storage == "sqlite" else JournalStorage())
+    store.load()
+    try:
+        if args.command == "import":
+            count = import_tasks(store, args.path, args.format, args.day)
+            print(f"Imported {count} tasks from {args.path}")
+        else:
+            count = export_tasks(store, args.path, args.format)
+            print(f"Exported {count} tasks to {args.path}")
+    finally:
+        store.close()
@@ -0,0 +1,132 @@
+"""Latency histograms, gauges and error tallies for Tado's debug overlay.
+
+Collection is off unless enabled: time() then hands back one shared no-op
+context manager and record() returns straight away, so instrumented code
+paths pay a method call and an attribute check.
+"""
+import bisect
+import json
+import os
+import threading
+import time
+
+METRICS_PATH = "metrics.json"
+# Upper bounds of the histogram buckets, in milliseconds
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+class Histogram:
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, ms):
+        self.buckets[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket that holds the given fraction of samples"""
+        wanted = fraction * self.count
+        seen = 0
+        for idx, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= wanted:
+                return BUCKETS_MS[idx] if idx < len(BUCKETS_MS) else self.max
+        return 0.0
+
+    def summary(self):
+        labels = [f"<={bound}ms" for bound in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}ms"]
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count, 3) if self.count else 0.0,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "max_ms": round(self.max, 3),
+            "buckets": {label: count for label, count in zip(labels, self.buckets) if count}
+        }
+
+class Timer:
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.record(self.name, time.perf_counter() - self.start)
+        return False
+
+class NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+NULL_TIMER = NullTimer()
+
+class Metrics:
+    """Thread-safe store for named latencies, gauges and errors"""
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.gauges = {}
+        self.errors = {}
+
+    def time(self, name):
+        """Context manager that records how long its block took under name"""
+        return Timer(self, name) if self.enabled else NULL_TIMER
+
+    def record(self, name, seconds):
+        if not self.enabled:
+            return
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.add(seconds * 1000)
+
+    def gauge(self, name, value):
+        """Keep the latest and the largest value seen for name"""
+        if not self.enabled:
+            return
+        with self.lock:
+            _, peak = self.gauges.get(name, (value, value))
+            self.gauges[name] = (value, max(peak, value))
+
+    def error(self, name, error):
+        """Print an error as before and, when enabled, count it under name"""
+        print(f"Error {name}: {error}")
+        if not self.enabled:
+            return
+        with self.lock:
+            count, _ = self.errors.get(name, (0, None))
+            self.errors[name] = (count + 1, str(error))
+
+    def summary(self):
+        with self.lock:
+            return {
+                "latency": {name: histogram.summary() for name, histogram in sorted(self.histograms.items())},
+                "gauges": {name: {"last": last, "max": peak} for name, (last, peak) in sorted(self.gauges.items())},
+                "errors": {name: {"count": count, "last": last} for name, (count, last) in sorted(self.errors.items())}
+            }
+
+    def dump(self, path=METRICS_PATH, **extra):
+        """Write the summary (plus any extra sections) to path as JSON"""
+        data = self.summary()
+        data.update(extra)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
+        return path
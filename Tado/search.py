@@ -0,0 +1,100 @@
+"""In-memory inverted index over task text for Tado's search box"""
+import bisect
+import heapq
+import re
+from itertools import count
+
+WORD = re.compile(r"\w+")
+
+def tokenize(text):
+    return set(WORD.findall(text.lower()))
+
+class SearchIndex:
+    """Maps words to task ids and is kept up to date one task at a time.
+
+    Every query word is treated as a prefix, so results narrow as the user
+    types. Prefixes are resolved against a sorted vocabulary with bisect.
+    """
+    def __init__(self, days):
+        self.day_order = {day: idx for idx, day in enumerate(days)}
+        self.postings = {}
+        self.vocabulary = []
+        self.entries = {}
+        self.counter = count()
+
+    def add(self, day, task):
+        if task["id"] in self.entries:
+            self.update(day, task)
+            return
+        tokens = tokenize(task["text"])
+        self.entries[task["id"]] = (day, tokens, next(self.counter), task)
+        for token in tokens:
+            self.add_posting(token, task["id"])
+
+    def update(self, day, task):
+        """Re-index a task after its text changed"""
+        entry = self.entries.get(task["id"])
+        if entry is None:
+            self.add(day, task)
+            return
+        _, old_tokens, order, _ = entry
+        tokens = tokenize(task["text"])
+        for token in old_tokens - tokens:
+            self.remove_posting(token, task["id"])
+        for token in tokens - old_tokens:
+            self.add_posting(token, task["id"])
+        self.entries[task["id"]] = (day, tokens, order, task)
+
+    def remove(self, task_id):
+        entry = self.entries.pop(task_id, None)
+        if entry is not None:
+            for token in entry[1]:
+                self.remove_posting(token, task_id)
+
+    def add_posting(self, token, task_id):
+        ids = self.postings.get(token)
+        if ids is None:
+            ids = self.postings[token] = set()
+            bisect.insort(self.vocabulary, token)
+        ids.add(task_id)
+
+    def remove_posting(self, token, task_id):
+        ids = self.postings[token]
+        ids.discard(task_id)
+        if not ids:
+            del self.postings[token]
+            del self.vocabulary[bisect.bisect_left(self.vocabulary, token)]
+
+    def prefix_matches(self, prefix):
+        """Union of the postings of every word starting with prefix"""
+        start = bisect.bisect_left(self.vocabulary, prefix)
+        end = bisect.bisect_left(self.vocabulary, prefix + "\uffff", start)
+        words = self.vocabulary[start:end]
+        if len(words) == 1:
+            return self.postings[words[0]]
+        matches = set()
+        for word in words:
+            matches |= self.postings[word]
+        return matches
+
+    def search(self, query, limit=None):
+        """Return (day, task) pairs matching every word, in day order"""
+        words = WORD.findall(query.lower())
+        if not words:
+            return []
+        candidates = sorted((self.prefix_matches(word) for word in words), key=len)
+        ids = set(candidates[0])
+        for matches in candidates[1:]:
+            ids &= matches
+            if not ids:
+                return []
+
+        def key(task_id):
+            day, _, order, _ = self.entries[task_id]
+            return self.day_order.get(day, len(self.day_order)), order
+
+        if limit is None:
+            results = sorted(ids, key=key)
+        else:
+            results = heapq.nsmallest(limit, ids, key=key)
+        return [(self.entries[task_id][0], self.entries[task_id][3]) for task_id in results]
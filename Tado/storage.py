@@ -0,0 +1,469 @@
+"""Task persistence for Tado: a JSON snapshot plus journal, or SQLite"""
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+
+SNAPSHOT_PATH = "tasks.json"
+JOURNAL_PATH = "tasks.journal"
+DATABASE_PATH = "tasks.db"
+FLUSH_WINDOW = 0.25  # Seconds to coalesce journal writes
+COMPACT_AFTER = 500  # Journal records before folding them into the snapshot
+
+def new_task_id():
+    """Stable key used to match tasks across rows, journals and stores"""
+    return uuid.uuid4().hex
+
+def normalize_task(task):
+    """Turn legacy string tasks into dicts and make sure every task has an id"""
+    if not isinstance(task, dict):
+        task = {"text": task, "completed": False}
+    if "id" not in task:
+        task["id"] = new_task_id()
+        return task, True
+    return task, False
+
+def replay(tasks, weather, records):
+    """Apply journal records in order; every record is safe to apply twice"""
+    index = {}
+
+    def day_index(day):
+        if day not in index:
+            index[day] = {task["id"]: task for task in tasks.setdefault(day, [])}
+        return index[day]
+
+    for record in records:
+        op = record["op"]
+        if op == "weather":
+            weather.update(record["weather"])
+        elif op == "add":
+            by_id = day_index(record["day"])
+            task = record["task"]
+            if task["id"] not in by_id:
+                tasks[record["day"]].append(task)
+                by_id[task["id"]] = task
+        elif op == "update":
+            task = day_index(record["day"]).get(record["id"])
+            if task is not None:
+                task.update(record["fields"])
+        elif op == "delete":
+            task = day_index(record["day"]).pop(record["id"], None)
+            if task is not None:
+                tasks[record["day"]].remove(task)
+
+def file_signature(path):
+    """(mtime, size) of a file, or None if it does not exist"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+def read_json_tasks(days, snapshot_path=SNAPSHOT_PATH, journal_path=JOURNAL_PATH):
+    """Read a snapshot plus journal into (tasks, weather, records, stale)"""
+    tasks = {day: [] for day in days}
+    weather = {"temperature": "", "last_update": ""}
+    stale = False
+
+    if os.path.exists(snapshot_path):
+        with open(snapshot_path, "r") as f:
+            data = json.load(f)
+        for day in days:
+            for task in data.get("tasks", {}).get(day, []):
+                task, assigned = normalize_task(task)
+                stale = stale or assigned
+                tasks[day].append(task)
+        weather.update(data.get("weather") or {})
+
+    records = []
+    if os.path.exists(journal_path):
+        with open(journal_path, "r") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # A crash mid-append can leave a torn last line
+                    break
+    replay(tasks, weather, records)
+    return tasks, weather, len(records), stale
+
+class LazyDays(dict):
+    """Day -> tasks mapping that fetches each day the first time it is used"""
+    def __init__(self, loader):
+        super().__init__()
+        self.loader = loader
+
+    def __missing__(self, day):
+        tasks = self[day] = self.loader(day)
+        return tasks
+
+class JournalStorage:
+    """Records each mutation as one journal line, written in the background.
+
+    Lines are coalesced for FLUSH_WINDOW seconds and appended in a single
+    write. Once COMPACT_AFTER records pile up, a copy of the tasks is written
+    to a temporary file that atomically replaces the snapshot, and the
+    journal is truncated. before_snapshot, when set, is called before each
+    snapshot is taken so changes another process made can be merged first.
+    """
+    def __init__(self, snapshot_path=SNAPSHOT_PATH, journal_path=JOURNAL_PATH,
+                 flush_window=FLUSH_WINDOW, compact_after=COMPACT_AFTER):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path
+        self.flush_window = flush_window
+        self.compact_after = compact_after
+        self.tasks = {}
+        self.weather = {"temperature": "", "last_update": ""}
+        self.journal_records = 0
+        self.queue = queue.Queue()
+        self.writer = None
+        self.writer_lock = threading.Lock()
+        self.written = (None, None)
+        self.outside_write = False
+        self.before_snapshot = None
+        # Set by the writer when a snapshot could not be written
+        self.retry_snapshot = False
+
+    def load(self, days):
+        """Read the snapshot, replay the journal and return (tasks, weather)"""
+        try:
+            self.tasks, self.weather, self.journal_records, stale = read_json_tasks(
+                days, self.snapshot_path, self.journal_path
+            )
+        except Exception:
+            # Move the unreadable files out of the way so the next snapshot
+            # starts afresh instead of replacing them
+            self.set_aside()
+            self.tasks = {day: [] for day in days}
+            raise
+        self.written = self.signatures()
+
+        # Ids handed out to legacy tasks only exist in memory until the
+        # snapshot is rewritten, so journal records could not refer to them
+        if stale or self.journal_records:
+            self.compact()
+        return self.tasks, self.weather
+
+    def set_aside(self):
+        for path in (self.snapshot_path, self.journal_path):
+            if not os.path.exists(path):
+                continue
+            target = path + ".corrupt"
+            if os.path.exists(target):
+                target = f"{target}.{int(time.time())}"
+            try:
+                os.replace(path, target)
+                print(f"Unreadable {path} kept as {target}")
+            except OSError as e:
+                print(f"Error setting aside {path}: {e}")
+
+    def record(self, entry):
+        self.queue_write("append", json.dumps(entry))
+        self.journal_records += 1
+        if self.journal_records >= self.compact_after:
+            self.compact()
+
+    def record_add(self, day, task):
+        self.record({"op": "add", "day": day, "task": task})
+
+    def record_add_many(self, day, tasks):
+        """Journal a bulk add as one write; the caller compacts afterwards"""
+        self.queue_write("append", "\n".join(
+            json.dumps({"op": "add", "day": day, "task": task}) for task in tasks
+        ))
+        self.journal_records += len(tasks)
+
+    def record_update(self, day, task_id, **fields):
+        self.record({"op": "update", "day": day, "id": task_id, "fields": fields})
+
+    def record_delete(self, day, task_id):
+        self.record({"op": "delete", "day": day, "id": task_id})
+
+    def record_delete_many(self, day, task_ids):
+        for task_id in task_ids:
+            self.record_delete(day, task_id)
+
+    def record_weather(self, temperature, last_update):
+        self.weather = {"temperature": temperature, "last_update": last_update}
+        self.queue_write("append", json.dumps({"op": "weather", "weather": self.weather}))
+        self.journal_records += 1
+
+    def compact(self):
+        """Queue a snapshot of the current tasks; it supersedes the journal"""
+        if self.before_snapshot is not None:
+            try:
+                self.before_snapshot()
+            except (OSError, ValueError) as e:
+                # Still write our own tasks rather than lose them
+                print(f"Error merging outside changes: {e}")
+        snapshot = {
+            "tasks": {day: [dict(task) for task in tasks] for day, tasks in self.tasks.items()},
+            "weather": dict(self.weather)
+        }
+        self.queue_write("snapshot", snapshot)
+        self.journal_records = 0
+
+    def checkpoint(self):
+        """Fold any journaled changes into the snapshot, or retry one that failed"""
+        if self.journal_records or self.retry_snapshot:
+            self.compact()
+
+    def signatures(self):
+        return file_signature(self.snapshot_path), file_signature(self.journal_path)
+
+    def written_signatures(self):
+        """(mtime, size) of the snapshot and journal right after our last write.
+
+        None once another process has written to them since the write
+        before, because our own write then also carries its changes.
+        """
+        return None if self.outside_write else self.written
+
+    def acknowledge(self, signatures):
+        """Files with these signatures have been read and merged by the caller"""
+        self.written = signatures
+        self.outside_write = False
+
+    def queue_write(self, kind, payload):
+        # Weather results are recorded from a worker thread
+        with self.writer_lock:
+            if self.writer is None:
+                self.writer = threading.Thread(target=self.run_writer, daemon=True)
+                self.writer.start()
+        self.queue.put((kind, payload))
+
+    def flush(self):
+        """Block until every queued write has reached the disk"""
+        if self.writer is not None:
+            self.queue.join()
+
+    def close(self):
+        with self.writer_lock:
+            if self.writer is not None:
+                self.queue.put(None)
+                self.writer.join()
+                self.writer = None
+
+    def run_writer(self):
+        while True:
+            batch = [self.queue.get()]
+            if batch[0] is not None:
+                time.sleep(self.flush_window)
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            lines = []
+            stop = False
+            try:
+                if self.signatures() != self.written:
+                    # Another process wrote since we did; sync must read the files
+                    self.outside_write = True
+                for item in batch:
+                    if item is None:
+                        stop = True
+                        break
+                    kind, payload = item
+                    if kind == "append":
+                        lines.append(payload)
+                    else:
+                        try:
+                            self.write_snapshot(payload)
+                        except OSError as e:
+                            # The pending lines still go to the journal below
+                            print(f"Error saving data: {e}")
+                            self.retry_snapshot = True
+                            continue
+                        # Everything journaled so far is part of the snapshot
+                        lines = []
+                        self.retry_snapshot = False
+                if lines:
+                    self.append_journal(lines)
+                self.written = self.signatures()
+            except OSError as e:
+                print(f"Error saving data: {e}")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+            if stop:
+                return
+
+    def append_journal(self, lines):
+        with open(self.journal_path, "a") as f:
+            f.write("\n".join(lines) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def write_snapshot(self, snapshot):
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(snapshot, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        open(self.journal_path, "w").close()
+
+class SQLiteStorage:
+    """Stores one row per task with a (day, position) index.
+
+    Days are only read when first shown, and every mutation is a single-row
+    statement. A new database imports an existing tasks.json and journal.
+    """
+    def __init__(self, path=DATABASE_PATH, snapshot_path=SNAPSHOT_PATH, journal_path=JOURNAL_PATH):
+        self.path = path
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path
+        self.tasks = {}
+        self.lock = threading.Lock()
+        self.conn = None
+
+    def connect(self):
+        is_new = not os.path.exists(self.path)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS tasks (
+                    id TEXT PRIMARY KEY,
+                    day TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    text TEXT NOT NULL,
+                    completed INTEGER NOT NULL DEFAULT 0,
+                    completed_at REAL
+                )
+            """)
+            columns = {row[1] for row in self.conn.execute("PRAGMA table_info(tasks)")}
+            if "completed_at" not in columns:
+                # Databases created before tasks were archived
+                self.conn.execute("ALTER TABLE tasks ADD COLUMN completed_at REAL")
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS tasks_day_position ON tasks (day, position)"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+            )
+        return is_new
+
+    def load(self, days):
+        """Return a lazy (tasks, weather) pair; days are read on first access"""
+        if self.connect():
+            self.import_json(days)
+        self.tasks = LazyDays(self.load_day)
+        return self.tasks, self.load_weather()
+
+    def import_json(self, days):
+        """Copy an existing tasks.json (plus journal) into a fresh database"""
+        if not os.path.exists(self.snapshot_path):
+            return
+        tasks, weather, _, _ = read_json_tasks(days, self.snapshot_path, self.journal_path)
+        with self.lock, self.conn:
+            self.conn.executemany(
+                """
+                INSERT OR IGNORE INTO tasks (id, day, position, text, completed, completed_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    (task["id"], day, position, task["text"], int(task["completed"]),
+                     task.get("completed_at"))
+                    for day, day_tasks in tasks.items()
+                    for position, task in enumerate(day_tasks)
+                )
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('weather', ?)",
+                (json.dumps(weather),)
+            )
+
+    def load_day(self, day):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, text, completed, completed_at FROM tasks WHERE day = ? ORDER BY position",
+                (day,)
+            ).fetchall()
+        return [
+            {"id": id, "text": text, "completed": bool(completed), "completed_at": completed_at}
+            for id, text, completed, completed_at in rows
+        ]
+
+    def load_weather(self):
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'weather'").fetchone()
+        return json.loads(row[0]) if row else {"temperature": "", "last_update": ""}
+
+    def record_add(self, day, task):
+        with self.lock, self.conn:
+            self.conn.execute(
+                """
+                INSERT OR IGNORE INTO tasks (id, day, position, text, completed, completed_at)
+                VALUES (?, ?, (SELECT COALESCE(MAX(position), -1) + 1 FROM tasks WHERE day = ?), ?, ?, ?)
+                """,
+                (task["id"], day, day, task["text"], int(task["completed"]), task.get("completed_at"))
+            )
+
+    def record_add_many(self, day, tasks):
+        with self.lock, self.conn:
+            start = self.conn.execute(
+                "SELECT COALESCE(MAX(position), -1) + 1 FROM tasks WHERE day = ?", (day,)
+            ).fetchone()[0]
+            self.conn.executemany(
+                """
+                INSERT OR IGNORE INTO tasks (id, day, position, text, completed, completed_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    (task["id"], day, start + offset, task["text"], int(task["completed"]),
+                     task.get("completed_at"))
+                    for offset, task in enumerate(tasks)
+                )
+            )
+
+    def record_update(self, day, task_id, **fields):
+        columns = {"text": "text", "completed": "completed", "completed_at": "completed_at"}
+        updates = [(columns[name], value) for name, value in fields.items() if name in columns]
+        if not updates:
+            return
+        assignments = ", ".join(f"{column} = ?" for column, _ in updates)
+        with self.lock, self.conn:
+            self.conn.execute(
+                f"UPDATE tasks SET {assignments} WHERE id = ?",
+                [value for _, value in updates] + [task_id]
+            )
+
+    def record_delete(self, day, task_id):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+
+    def record_delete_many(self, day, task_ids):
+        with self.lock, self.conn:
+            self.conn.executemany("DELETE FROM tasks WHERE id = ?", ((task_id,) for task_id in task_ids))
+
+    def record_weather(self, temperature, last_update):
+        weather = {"temperature": temperature, "last_update": last_update}
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('weather', ?)",
+                (json.dumps(weather),)
+            )
+
+    def compact(self):
+        """Every change is already committed; nothing to fold"""
+
+    def checkpoint(self):
+        """Move committed pages from the write-ahead log into the database"""
+        with self.lock:
+            self.conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+    def flush(self):
+        """Every change is already committed; nothing to wait for"""
+
+    def close(self):
+        if self.conn is not None:
+            with self.lock:
+                self.conn.close()
+            self.conn = None
@@ -0,0 +1,112 @@
+"""Keeps Tado instances that share a synced tasks.json in step"""
+from storage import file_signature, new_task_id, read_json_tasks
+
+FIELDS = ("text", "completed", "completed_at")
+
+def fingerprint(tasks):
+    return hash(tuple((task["id"],) + tuple(task.get(field) for field in FIELDS) for task in tasks))
+
+def same_fields(task, other):
+    return all(task.get(field) == other.get(field) for field in FIELDS)
+
+def merge_day(base, local, remote):
+    """Three-way merge of one day's tasks; local task dicts are updated in place.
+
+    base maps task id -> the task as last seen on disk. A field changed on
+    only one side takes that side's value. Deleting a task loses to an edit
+    of it on the other side, and when both sides changed the text the
+    remote version is kept as a separate task, so no edit is dropped.
+    """
+    remote_by_id = {task["id"]: task for task in remote}
+    local_ids = set()
+    merged = []
+    for task in local:
+        local_ids.add(task["id"])
+        old = base.get(task["id"])
+        theirs = remote_by_id.get(task["id"])
+        if old is None or theirs is None:
+            # Added here, or deleted there; keep it unless it was untouched
+            if theirs is None and old is not None and same_fields(task, old):
+                continue
+            merged.append(task)
+            continue
+
+        conflict = task["text"] != old["text"] and theirs["text"] not in (old["text"], task["text"])
+        for field in FIELDS:
+            if theirs.get(field) != old.get(field) and task.get(field) == old.get(field):
+                task[field] = theirs.get(field)
+        merged.append(task)
+        if conflict:
+            merged.append(dict(theirs, id=new_task_id()))
+
+    for theirs in remote:
+        if theirs["id"] in local_ids:
+            continue
+        old = base.get(theirs["id"])
+        # Added there, or edited there after being deleted here
+        if old is None or not same_fields(theirs, old):
+            merged.append(dict(theirs))
+    return merged
+
+class SyncWatcher:
+    """Notices other instances' writes to the snapshot or journal and merges them.
+
+    check() only stats the files; they are parsed only when their
+    (mtime, size) differs from what this instance last read or wrote, and
+    only days whose contents differ from the last merge are merged. Once
+    started, every snapshot the storage writes runs check() first, so a
+    snapshot never replaces tasks another instance saved in the meantime.
+    """
+    def __init__(self, store):
+        self.store = store
+        self.storage = store.storage
+        self.paths = (self.storage.snapshot_path, self.storage.journal_path)
+        self.signatures = None
+        self.base = {}
+        self.fingerprints = {}
+
+    def start(self):
+        """Take the store's freshly loaded tasks as the common base"""
+        for day in self.store.days:
+            self.remember(day, self.store.tasks[day])
+        self.signatures = self.current_signatures()
+        self.storage.before_snapshot = self.merge_before_snapshot
+
+    def remember(self, day, tasks):
+        self.base[day] = {task["id"]: {field: task.get(field) for field in FIELDS} for task in tasks}
+        self.fingerprints[day] = fingerprint(tasks)
+
+    def current_signatures(self):
+        return tuple(file_signature(path) for path in self.paths)
+
+    def merge_before_snapshot(self):
+        """Storage hook; the snapshot about to be written publishes the merge"""
+        self.check(publish=False)
+
+    def check(self, publish=True):
+        """Merge outside changes; returns the set of days that changed"""
+        if self.signatures is None:
+            return set()
+        signatures = self.current_signatures()
+        if signatures == self.signatures or signatures == self.storage.written_signatures():
+            self.signatures = signatures
+            return set()
+
+        self.storage.flush()
+        # Taken before reading, so a write that lands during the read is seen next time
+        self.signatures = self.current_signatures()
+        self.storage.acknowledge(self.signatures)
+        remote, _, _, _ = read_json_tasks(self.store.days, *self.paths)
+
+        changed = set()
+        for day in self.store.days:
+            if fingerprint(remote[day]) == self.fingerprints[day]:
+                continue
+            merged = merge_day(self.base[day], self.store.tasks[day], remote[day])
+            self.store.replace_day(day, merged)
+            self.remember(day, merged)
+            changed.add(day)
+        if changed and publish:
+            # Publish the merged result so the other instances converge on it
+            self.store.save()
+        return changed
@@ -1,39 +1,459 @@
+import time
+IMPORT_STARTED = time.perf_counter()
+
+import argparse
+from collections import OrderedDict
 import customtkinter as ctk
-from datetime import datetime
 import json
 import os
-import requests
-from threading import Thread
+import sys
+import tkinter as tk
+from tkinter import filedialog
+from datetime import datetime
 from functools import partial
+from archive import ARCHIVE_AFTER_DAYS, TaskArchive
+from bulk import export_tasks, import_batches
+from metrics import METRICS_PATH, Metrics
+from storage import DATABASE_PATH, JournalStorage, SQLiteStorage
+from sync import SyncWatcher
+from task_store import DAYS, TaskStore
+from weather import WEATHER_TTL, WeatherClient, WeatherService
+IMPORT_FINISHED = time.perf_counter()
 
 ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("blue")
 
+# Days longer than this are shown in the virtualized list
+VIRTUAL_THRESHOLD = 300
+ROW_HEIGHT = 44
+OVERSCAN = 4
+# Row widgets kept alive across cached day panels before the LRU day is dropped
+MAX_CACHED_ROWS = 600
+# How often the debug overlay redraws while it is shown
+OVERLAY_REFRESH_MS = 1000
+# How often to look for a finished weather fetch while one is running
+WEATHER_POLL_MS = 200
+MAX_SEARCH_RESULTS = 8
+ARCHIVE_INTERVAL = 3600  # Seconds between scans for tasks to archive
+
+class TaskRow(ctk.CTkFrame):
+    """Recyclable row widget that displays one task at a time"""
+    def __init__(self, master, on_toggle, on_edit):
+        super().__init__(master, fg_color="#2B2B2B")
+        self.task_id = None
+        self.rendered = None
+
+        # Checkbox
+        self.checkbox = ctk.CTkCheckBox(
+            self,
+            text="",
+            width=30,
+            command=lambda: on_toggle(self.task_id)
+        )
+        self.checkbox.pack(side="left", padx=10)
+
+        # Task text
+        self.label = ctk.CTkLabel(self, text="", anchor="w")
+        self.label.pack(side="left", fill="x", expand=True)
+
+        # Edit button
+        self.edit_btn = ctk.CTkButton(
+            self,
+            text="✎",
+            width=30,
+            height=30,
+            fg_color="transparent",
+            hover_color="#444444",
+            command=lambda: on_edit(self.task_id)
+        )
+        self.edit_btn.pack(side="right", padx=5)
+
+    def show_task(self, task):
+        """Point the row at a task, reconfiguring only what changed"""
+        self.task_id = task["id"]
+        state = (task["text"], task["completed"])
+        if state == self.rendered:
+            return
+
+        text, completed = state
+        if completed:
+            self.checkbox.select()
+        else:
+            self.checkbox.deselect()
+        self.label.configure(
+            text=text,
+            font=("Helvetica", 14, "overstrike" if completed else "normal"),
+            text_color="#666666" if completed else "#FFFFFF"
+        )
+        self.rendered = state
+
+    def flash(self):
+        """Briefly highlight the row, e.g. after jumping to a search result"""
+        self.configure(fg_color="#1F538D")
+        self.after(1200, lambda: self.configure(fg_color="#2B2B2B"))
+
+class TaskList(ctk.CTkScrollableFrame):
+    """Scrollable task list that diffs tasks against keyed, pooled rows"""
+    def __init__(self, master, on_toggle, on_edit, **kwargs):
+        super().__init__(master, **kwargs)
+        self.on_toggle = on_toggle
+        self.on_edit = on_edit
+        self.rows = {}
+        self.order = []
+        self.pool = []
+
+    def render(self, tasks):
+        """Create, update or remove only the rows whose task changed"""
+        keys = [task["id"] for task in tasks]
+        wanted = set(keys)
+        for key in self.order:
+            if key not in wanted:
+                self.release_row(key)
+
+        survivors = [key for key in self.order if key in wanted]
+        reordered = [key for key in keys if key in self.rows] != survivors
+
+        previous = None
+        for task in tasks:
+            row = self.rows.get(task["id"])
+            if row is None:
+                row = self.acquire_row(task["id"])
+                self.pack_row(row, previous, survivors)
+            elif reordered:
+                self.pack_row(row, previous, survivors)
+            row.show_task(task)
+            previous = row
+        self.order = keys
+
+    def acquire_row(self, key):
+        row = self.pool.pop() if self.pool else TaskRow(self, self.on_toggle, self.on_edit)
+        self.rows[key] = row
+        return row
+
+    def release_row(self, key):
+        row = self.rows.pop(key)
+        row.pack_forget()
+        self.pool.append(row)
+
+    def pack_row(self, row, previous, survivors):
+        if previous is not None:
+            row.pack(fill="x", pady=2, after=previous)
+        elif survivors and self.rows[survivors[0]] is not row:
+            row.pack(fill="x", pady=2, before=self.rows[survivors[0]])
+        else:
+            row.pack(fill="x", pady=2)
+
+    def scroll_to(self, index):
+        """Scroll a row into view and highlight it"""
+        row = self.rows.get(self.order[index])
+        if row is None:
+            return
+        self.update_idletasks()
+        self._parent_canvas.yview_moveto(row.winfo_y() / max(1, self.winfo_height()))
+        row.flash()
+
+    def create_editor(self, task_id, **kwargs):
+        """Edit frame placed right below the task's row"""
+        editor = ctk.CTkFrame(self, **kwargs)
+        row = self.rows.get(task_id)
+        if row is not None:
+            editor.pack(fill="x", pady=2, after=row)
+        else:
+            editor.pack(fill="x", pady=2)
+        return editor
+
+class VirtualTaskList(ctk.CTkFrame):
+    """Task list that only keeps rows for the visible window plus overscan"""
+    def __init__(self, master, on_toggle, on_edit, **kwargs):
+        super().__init__(master, **kwargs)
+        self.on_toggle = on_toggle
+        self.on_edit = on_edit
+        self.tasks = []
+        self.rows = {}
+        self.windows = {}
+        self.pool = []
+
+        self.scrollbar = ctk.CTkScrollbar(
+            self,
+            button_color="#2B2B2B",
+            button_hover_color="#2B2B2B"
+        )
+        self.scrollbar.pack(side="right", fill="y")
+
+        self.canvas = tk.Canvas(
+            self,
+            bg="gray17",
+            highlightthickness=0,
+            bd=0,
+            yscrollincrement=ROW_HEIGHT // 2
+        )
+        self.canvas.pack(side="left", fill="both", expand=True)
+        self.canvas.configure(yscrollcommand=self.on_scroll)
+        self.scrollbar.configure(command=self.canvas.yview)
+
+        self.canvas.bind("<Configure>", self.on_resize)
+        self.bind_mousewheel(self.canvas)
+
+    def render(self, tasks):
+        """Point the list at a task list and refill the visible rows"""
+        self.tasks = tasks
+        self.canvas.configure(
+            scrollregion=(0, 0, self.canvas.winfo_width(), len(tasks) * ROW_HEIGHT)
+        )
+        for index in list(self.rows):
+            if index < len(tasks):
+                self.rows[index].show_task(tasks[index])
+            else:
+                self.release_row(index)
+        self.refresh_window()
+
+    def visible_range(self):
+        top = self.canvas.canvasy(0)
+        bottom = top + self.canvas.winfo_height()
+        first = max(0, int(top // ROW_HEIGHT) - OVERSCAN)
+        last = min(len(self.tasks), int(bottom // ROW_HEIGHT) + 1 + OVERSCAN)
+        return first, last
+
+    def refresh_window(self):
+        """Recycle rows that scrolled out and fill the ones scrolled in"""
+        first, last = self.visible_range()
+        for index in list(self.rows):
+            if not first <= index < last:
+                self.release_row(index)
+        for index in range(first, last):
+            if index not in self.rows:
+                self.acquire_row(index).show_task(self.tasks[index])
+
+    def acquire_row(self, index):
+        if self.pool:
+            row = self.pool.pop()
+            window = self.windows[row]
+            self.canvas.coords(window, 0, index * ROW_HEIGHT)
+            self.canvas.itemconfigure(window, state="normal")
+        else:
+            row = TaskRow(self.canvas, self.on_toggle, self.on_edit)
+            for widget in (row, row.checkbox, row.label, row.edit_btn):
+                self.bind_mousewheel(widget)
+            self.windows[row] = self.canvas.create_window(
+                0, index * ROW_HEIGHT,
+                window=row,
+                anchor="nw",
+                width=self.canvas.winfo_width(),
+                height=ROW_HEIGHT - 4
+            )
+        self.rows[index] = row
+        return row
+
+    def release_row(self, index):
+        row = self.rows.pop(index)
+        self.canvas.itemconfigure(self.windows[row], state="hidden")
+        self.pool.append(row)
+
+    def on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self.refresh_window()
+
+    def on_resize(self, event):
+        for window in self.windows.values():
+            self.canvas.itemconfigure(window, width=event.width)
+        self.canvas.configure(
+            scrollregion=(0, 0, event.width, len(self.tasks) * ROW_HEIGHT)
+        )
+        self.refresh_window()
+
+    def bind_mousewheel(self, widget):
+        # Bound per widget so the bindings go away with an evicted list
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            widget.bind(sequence, self.on_mousewheel, add="+")
+
+    def on_mousewheel(self, event):
+        if event.num == 4 or event.delta > 0:
+            self.canvas.yview_scroll(-3, "units")
+        else:
+            self.canvas.yview_scroll(3, "units")
+
+    def scroll_to(self, index):
+        """Scroll a row into view and highlight it"""
+        self.canvas.yview_moveto(index / max(1, len(self.tasks)))
+        self.refresh_window()
+        if index in self.rows:
+            self.rows[index].flash()
+
+    def create_editor(self, task_id, **kwargs):
+        """Edit frame pinned above the list, since rows are recycled"""
+        editor = ctk.CTkFrame(self, **kwargs)
+        editor.pack(side="top", fill="x", pady=2, before=self.scrollbar)
+        return editor
+
+class ArchiveView(ctk.CTkToplevel):
+    """Read-only window that reads archived tasks one page at a time"""
+    def __init__(self, master, archive):
+        super().__init__(master)
+        self.title("Archived tasks")
+        self.geometry("350x500")
+        self.pages = archive.pages()
+
+        self.records_frame = ctk.CTkScrollableFrame(self, corner_radius=0)
+        self.records_frame.pack(fill="both", expand=True, padx=5, pady=5)
+
+        self.more_btn = ctk.CTkButton(self, text="Load more", height=30, command=self.load_page)
+        self.more_btn.pack(pady=(0, 5))
+        self.load_page()
+
+    def load_page(self):
+        page = next(self.pages, None)
+        if page is None:
+            self.more_btn.configure(text="End of archive", state="disabled")
+            return
+        for record in page:
+            completed = ""
+            if record.get("completed_at"):
+                completed = datetime.fromtimestamp(record["completed_at"]).strftime("  (%b %d %Y)")
+            ctk.CTkLabel(
+                self.records_frame,
+                text=f"{record['day'][:3]}  {record['text']}{completed}",
+                font=("Helvetica", 14, "overstrike"),
+                text_color="#666666",
+                anchor="w"
+            ).pack(fill="x", padx=10, pady=1)
+
+def format_age(seconds):
+    """Short age such as "5m", "3h" or "2d" for the weather label"""
+    minutes = int(seconds // 60)
+    if minutes < 60:
+        return f"{minutes}m"
+    hours = minutes // 60
+    if hours < 48:
+        return f"{hours}h"
+    return f"{hours // 24}d"
+
+class MinuteScheduler:
+    """Single after() timer that wakes just past each wall-clock minute"""
+    def __init__(self, widget):
+        self.widget = widget
+        self.jobs = []
+        self.timer = None
+
+    def add_job(self, job):
+        self.jobs.append(job)
+
+    def start(self):
+        self.tick()
+
+    def stop(self):
+        if self.timer is not None:
+            self.widget.after_cancel(self.timer)
+            self.timer = None
+
+    def tick(self):
+        for job in self.jobs:
+            try:
+                job()
+            except Exception as e:
+                print(f"Scheduled job error: {e}")
+        # A little slack so the clock never shows the minute that just ended
+        delay = 60 - time.time() % 60
+        self.timer = self.widget.after(int(delay * 1000) + 20, self.tick)
+
 class TodoApp(ctk.CTk):
-    def __init__(self):
+    def __init__(self, storage=None, timing=False, archive_after_days=ARCHIVE_AFTER_DAYS, debug=False):
         super().__init__()
         self.title("Tado")
         self.geometry("350x700")
         self.resizable(False, False)
 
-        # Weather data
+        # Startup timings in seconds, reported with --timing
+        self.timing = timing
+        self.timings = {"import": IMPORT_FINISHED - IMPORT_STARTED}
+
+        # Latency histograms and widget counts; collected only with --debug
+        # or while the overlay is open (F12)
+        self.debug = debug
+        self.metrics = Metrics(enabled=debug)
+        self.debug_overlay = None
+        self.overlay_timer = None
+
+        # Weather data; the last good reading is shown straight away and the
+        # service that revalidates it is created after the first paint
+        self.weather_client = WeatherClient()
+        self.weather = None
+        self.polling_weather = False
         self.temperature = "Loading..."
         self.last_weather_update = None
+        self.weather_expires = None
 
-        self.days = ["MONDAY", "TUESDAY", "WEDNESDAY", "THURSDAY", "FRIDAY", "SATURDAY", "SUNDAY"]
-        self.tasks = {day: [] for day in self.days}
+        self.days = DAYS
+        self.store = TaskStore(storage)
+        self.archive = TaskArchive()
+        self.archive_after_days = archive_after_days
+        self.archive_view = None
+        self.last_archive_run = None
+        self.started = False
+        load_started = time.perf_counter()
         self.load_tasks()
+        self.use_cached_weather()
+        self.timings["load"] = time.perf_counter() - load_started
         self.current_day = "MONDAY"
 
-        # Create main UI components
+        # Other instances sharing tasks.json (e.g. through a synced folder)
+        # are merged in by the minute scheduler; SQLite has its own locking
+        self.sync = SyncWatcher(self.store) if isinstance(self.store.storage, JournalStorage) else None
+
+        # Create the UI needed for the first paint; the rest waits for idle
         self.create_fixed_header()
         self.create_task_input()
+        self.create_search_box()
         self.create_scrollable_tasks()
-        self.create_day_blocks()
 
         # Start updates
-        self.update_clock()
+        self.date_text = None
+        self.scheduler = MinuteScheduler(self)
+        self.scheduler.add_job(self.update_clock)
+        self.scheduler.add_job(self.update_weather)
+        # Merge other instances' changes before this one writes a snapshot
+        self.scheduler.add_job(self.sync_tasks)
+        self.scheduler.add_job(self.checkpoint_tasks)
+        self.scheduler.add_job(self.archive_old_tasks)
+        self.scheduler.start()
+
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.bind("<Control-i>", self.import_file)
+        self.bind("<Control-e>", self.export_file)
+        self.bind("<F12>", self.toggle_debug_overlay)
+        self.bind("<Shift-F12>", self.dump_metrics)
+        self.after_idle(self.finish_startup)
+
+    def finish_startup(self):
+        """Deferred startup work that should not delay the first paint"""
+        self.update_idletasks()
+        self.timings["first_paint"] = time.perf_counter() - IMPORT_STARTED
+
+        self.create_day_blocks()
+        self.weather = WeatherService(self.weather_client, metrics=self.metrics)
         self.update_weather()
+        # Backends that load lazily read the other days now, and an empty
+        # search builds the index so the first keystroke is instant
+        self.store.search("")
+        if self.sync is not None:
+            self.sync.start()
+        self.started = True
+        self.archive_old_tasks()
+
+        self.timings["ready"] = time.perf_counter() - IMPORT_STARTED
+        if self.timing:
+            print(json.dumps({name: round(seconds, 4) for name, seconds in self.timings.items()}),
+                  file=sys.stderr)
+
+    def on_close(self):
+        """Write a final snapshot before the window goes away"""
+        self.scheduler.stop()
+        self.save_tasks()
+        self.store.close()
+        if self.weather is not None:
+            self.weather.close()
+        if self.metrics.enabled:
+            self.dump_metrics()
+        self.destroy()
 
     def create_fixed_header(self):
         """Fixed header at top with day and weather"""
@@ -78,19 +498,121 @@ class TodoApp(ctk.CTk):
         )
         self.add_btn.pack(side="left")
 
+    def create_search_box(self):
+        """Search across all days, filtering as the user types"""
+        self.search_frame = ctk.CTkFrame(self, fg_color="transparent")
+        self.search_frame.pack(fill="x", padx=15, pady=(0, 10))
+
+        search_row = ctk.CTkFrame(self.search_frame, fg_color="transparent")
+        search_row.pack(fill="x")
+
+        self.search_entry = ctk.CTkEntry(
+            search_row,
+            placeholder_text="Search all days...",
+            height=30
+        )
+        self.search_entry.pack(side="left", fill="x", expand=True, padx=(0, 5))
+
+        self.archive_btn = ctk.CTkButton(
+            search_row,
+            text="Archived",
+            width=80,
+            height=30,
+            fg_color="#2B2B2B",
+            hover_color="#444444",
+            command=self.toggle_archive_view
+        )
+        self.archive_btn.pack(side="right")
+        self.search_entry.bind("<KeyRelease>", self.on_search)
+        self.search_entry.bind("<Escape>", self.clear_search)
+
+        # Result buttons are created on demand and reused for every query
+        self.results_frame = ctk.CTkFrame(self.search_frame, fg_color="#2B2B2B")
+        self.result_buttons = []
+        self.search_results = []
+
+    def on_search(self, event=None):
+        query = self.search_entry.get()
+        with self.metrics.time("search"):
+            self.search_results = self.store.search(query, MAX_SEARCH_RESULTS) if query.strip() else []
+
+        while len(self.result_buttons) < len(self.search_results):
+            button = ctk.CTkButton(
+                self.results_frame,
+                text="",
+                height=26,
+                anchor="w",
+                fg_color="transparent",
+                hover_color="#444444",
+                command=partial(self.open_search_result, len(self.result_buttons))
+            )
+            self.result_buttons.append(button)
+
+        for idx, button in enumerate(self.result_buttons):
+            if idx < len(self.search_results):
+                day, task = self.search_results[idx]
+                button.configure(text=f"{day[:3]}  {task['text']}")
+                button.pack(fill="x", padx=5, pady=1)
+            else:
+                button.pack_forget()
+
+        if self.search_results:
+            self.results_frame.pack(fill="x", pady=(5, 0))
+        else:
+            self.results_frame.pack_forget()
+
+    def open_search_result(self, result_index):
+        """Jump to the day and row of a search result"""
+        day, task = self.search_results[result_index]
+        self.clear_search()
+        self.switch_day(day)
+        idx = self.store.task_index(day, task["id"])
+        if idx is not None:
+            self.active_list.scroll_to(idx)
+
+    def clear_search(self, event=None):
+        self.search_entry.delete(0, "end")
+        self.on_search()
+
     def create_scrollable_tasks(self):
         """Scrollable area for tasks only"""
-        self.tasks_scrollable = ctk.CTkScrollableFrame(
-            self,
+        self.tasks_area = ctk.CTkFrame(self, fg_color="transparent")
+        self.tasks_area.pack(fill="both", expand=True, padx=5)
+
+        # Day -> task panel, least recently shown first
+        self.day_panels = OrderedDict()
+        self.active_list = None
+        self.show_day_tasks(self.current_day)
+
+    def create_day_panel(self, virtual):
+        if virtual:
+            return VirtualTaskList(
+                self.tasks_area,
+                on_toggle=self.on_row_toggle,
+                on_edit=self.on_row_edit,
+                corner_radius=0
+            )
+        return TaskList(
+            self.tasks_area,
+            on_toggle=self.on_row_toggle,
+            on_edit=self.on_row_edit,
             corner_radius=0,
             scrollbar_button_color="#2B2B2B",
             scrollbar_button_hover_color="#2B2B2B"
         )
-        self.tasks_scrollable.pack(fill="both", expand=True, padx=5)
-        
-        self.tasks_container = ctk.CTkFrame(self.tasks_scrollable, fg_color="transparent")
-        self.tasks_container.pack(fill="x")
-        self.show_day_tasks(self.current_day)
+
+    def evict_day_panels(self):
+        """Destroy least recently shown panels while too many rows are alive"""
+        cached_rows = sum(len(panel.rows) + len(panel.pool) for panel in self.day_panels.values())
+        for day in list(self.day_panels):
+            if cached_rows <= MAX_CACHED_ROWS:
+                break
+            panel = self.day_panels[day]
+            if panel is self.active_list:
+                continue
+            cached_rows -= len(panel.rows) + len(panel.pool)
+            del self.day_panels[day]
+            panel.destroy()
 
     def create_scrollable_area(self):
         """Create scrollable area for tasks and header"""
@@ -149,48 +671,71 @@ class TodoApp(ctk.CTk):
         self.tasks_container.pack(fill="x")
         self.show_day_tasks(self.current_day)
 
-    def get_location(self):
-        """Get approximate location using IP address"""
-        try:
-            response = requests.get("https://ipapi.co/json/", timeout=5)
-            data = response.json()
-            return data["latitude"], data["longitude"]
-        except:
-            return None, None
-
-    def fetch_weather(self):
-        """Fetch temperature using Open-Meteo API"""
-        try:
-            lat, lon = self.get_location()
-            if lat and lon:
-                url = f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&current=temperature_2m&temperature_unit=fahrenheit"
-                response = requests.get(url, timeout=5)
-                data = response.json()
-                self.temperature = f"{data['current']['temperature_2m']}°F"
-            else:
+    def use_cached_weather(self):
+        """Show the last good reading from weather.json if it is the newest we have"""
+        reading = self.weather_client.cached_reading()
+        if reading is None:
+            return
+        fetched = datetime.fromtimestamp(reading["fetched_at"])
+        if self.last_weather_update is None or fetched >= self.last_weather_update:
+            self.temperature = reading["temperature"]
+            self.last_weather_update = fetched
+            self.weather_expires = reading["expires_at"]
+
+    def weather_text(self):
+        """Temperature, followed by its age once the reading is no longer fresh"""
+        if self.last_weather_update is None:
+            return self.temperature
+        expires = self.weather_expires
+        if expires is None:
+            expires = self.last_weather_update.timestamp() + WEATHER_TTL
+        if time.time() < expires:
+            return self.temperature
+        age = (datetime.now() - self.last_weather_update).total_seconds()
+        return f"{self.temperature} ({format_age(age)} ago)"
+
+    def apply_weather(self, temperature, error):
+        """Take a fetch result on the UI thread and show it right away"""
+        if error is not None:
+            self.metrics.error("fetching weather", error)
+            # Offline: keep showing the last good reading, with its age
+            if self.last_weather_update is None:
                 self.temperature = "N/A°F"
-            self.last_weather_update = datetime.now()
-        except Exception as e:
-            print(f"Weather error: {e}")
-            self.temperature = "N/A°F"
+        else:
+            self.temperature = temperature
+            self.use_cached_weather()
+            self.store.record_weather(self.temperature, self.last_weather_update.isoformat())
+        self.refresh_date_label()
+
+    def poll_weather(self):
+        """Check for fetch results until no fetch is in flight"""
+        busy = self.weather.in_flight
+        for temperature, error in self.weather.poll():
+            self.apply_weather(temperature, error)
+        if busy:
+            self.after(WEATHER_POLL_MS, self.poll_weather)
+        else:
+            self.polling_weather = False
 
     def update_weather(self):
-        """Update weather in background thread only if data is stale"""
-        needs_update = True
-        if self.last_weather_update:
-            needs_update = (datetime.now() - self.last_weather_update).seconds >= 3600
-        
-        if needs_update:
-            Thread(target=self.fetch_weather, daemon=True).start()
-        
-        self.after(60000, self.update_weather)  # Check every minute
+        """Revalidate the reading in a background thread once it goes stale"""
+        if self.weather is None:
+            return
+        if self.weather.due() and self.weather.request() and not self.polling_weather:
+            self.polling_weather = True
+            self.after(WEATHER_POLL_MS, self.poll_weather)
+
+    def refresh_date_label(self):
+        """Reconfigure the label only when its text actually changes"""
+        now = datetime.now()
+        time_str = now.strftime("%B %d %Y – %I:%M%p – ") + self.weather_text()
+        if time_str != self.date_text:
+            self.date_label.configure(text=time_str)
+            self.date_text = time_str
 
     def update_clock(self):
         """Update time and temperature display"""
-        now = datetime.now()
-        time_str = now.strftime("%B %d %Y – %I:%M%p – ") + self.temperature
-        self.date_label.configure(text=time_str)
-        self.after(60000, self.update_clock)
+        self.refresh_date_label()
 
     def create_main_container(self):
         """Create main layout with fixed header and scrollable tasks"""
@@ -279,18 +824,17 @@ class TodoApp(ctk.CTk):
         right_col = ctk.CTkFrame(grid_frame, fg_color="transparent")
         right_col.pack(side="right", fill="x", expand=True)
 
-        # Add day blocks to columns
+        # Blocks for every day are built once; the current day's is hidden
         columns = [left_col, right_col]
+        self.day_blocks = {}
         for idx, day in enumerate(self.days):
-            if day == self.current_day:
-                continue
-                
             block = ctk.CTkFrame(
                 columns[idx % 2],
                 height=60,
                 fg_color="#2B2B2B"
             )
-            block.pack(fill="x", pady=2, padx=2)
+            if day != self.current_day:
+                block.pack(fill="x", pady=2, padx=2)
             
             label = ctk.CTkLabel(
                 block,
@@ -303,75 +847,105 @@ class TodoApp(ctk.CTk):
             # Bind click events using partial
             for widget in [block, label]:
                 widget.bind("<Button-1>", partial(self.switch_day, day))
+            self.day_blocks[day] = block
+
+    def swap_day_blocks(self, old_day, new_day):
+        """Hide the new day's block and put the old day's back in its slot"""
+        self.day_blocks[new_day].pack_forget()
+
+        # Keep the old block above the next visible block in its column
+        idx = self.days.index(old_day)
+        following = [
+            self.day_blocks[day] for day in self.days[idx + 2::2] if day != new_day
+        ]
+        if following:
+            self.day_blocks[old_day].pack(fill="x", pady=2, padx=2, before=following[0])
+        else:
+            self.day_blocks[old_day].pack(fill="x", pady=2, padx=2)
 
     def switch_day(self, new_day, event=None):
-        """Handle day switching with proper refresh"""
+        """Handle day switching by swapping cached panels and blocks"""
         if new_day != self.current_day:
+            old_day = self.current_day
             self.current_day = new_day
             self.day_label.configure(text=new_day)
             self.show_day_tasks(new_day)
-            # Rebuild day blocks
-            self.day_blocks_frame.destroy()
-            self.create_day_blocks()
+            self.swap_day_blocks(old_day, new_day)
 
     def show_day_tasks(self, day):
-        """Show tasks for specified day"""
-        for widget in self.tasks_container.winfo_children():
-            widget.destroy()
-        
-        for idx, task in enumerate(self.tasks[day]):
-            task_frame = ctk.CTkFrame(self.tasks_container, fg_color="#2B2B2B")
-            task_frame.pack(fill="x", pady=2)
+        """Show tasks for specified day, reusing its cached panel"""
+        with self.metrics.time("render"):
+            self.render_day_tasks(day)
+        if self.metrics.enabled:
+            self.count_widgets()
 
-            # Checkbox
-            checkbox = ctk.CTkCheckBox(
-                task_frame,
-                text="",
-                width=30,
-                command=partial(self.toggle_task, idx)
-            )
-            checkbox.pack(side="left", padx=10)
-            if task["completed"]:
-                checkbox.select()
+    def render_day_tasks(self, day):
+        tasks = self.tasks[day]
+        virtual = len(tasks) > VIRTUAL_THRESHOLD
+        panel = self.day_panels.get(day)
+        if panel is not None and isinstance(panel, VirtualTaskList) != virtual:
+            del self.day_panels[day]
+            if panel is self.active_list:
+                self.active_list = None
+            panel.destroy()
+            panel = None
+        if panel is None:
+            panel = self.day_panels[day] = self.create_day_panel(virtual)
+        self.day_panels.move_to_end(day)
 
-            # Task text
-            text_color = "#666666" if task["completed"] else "#FFFFFF"
-            font_style = ("Helvetica", 14, "overstrike" if task["completed"] else "normal")
-            
-            ctk.CTkLabel(
-                task_frame,
-                text=task["text"],
-                font=font_style,
-                text_color=text_color,
-                anchor="w"
-            ).pack(side="left", fill="x", expand=True)
-
-            # Edit button
-            ctk.CTkButton(
-                task_frame,
-                text="✎",
-                width=30,
-                height=30,
-                fg_color="transparent",
-                hover_color="#444444",
-                command=partial(self.edit_task, idx)
-            ).pack(side="right", padx=5)
+        if panel is not self.active_list:
+            if self.active_list is not None:
+                self.active_list.pack_forget()
+            panel.pack(fill="both", expand=True)
+            self.active_list = panel
+        panel.render(tasks)
+        self.evict_day_panels()
+
+    def count_widgets(self):
+        """Record how many widgets exist after a rebuild"""
+        total = 0
+        pending = [self]
+        while pending:
+            widget = pending.pop()
+            children = widget.winfo_children()
+            total += len(children)
+            pending.extend(children)
+        self.metrics.gauge("widgets.total", total)
+        self.metrics.gauge("widgets.rows", sum(len(panel.rows) for panel in self.day_panels.values()))
+        self.metrics.gauge("widgets.pooled", sum(len(panel.pool) for panel in self.day_panels.values()))
+        self.metrics.gauge("widgets.panels", len(self.day_panels))
+
+    @property
+    def tasks(self):
+        return self.store.tasks
+
+    def task_index(self, task_id):
+        """Find the current position of a task in the current day"""
+        return self.store.task_index(self.current_day, task_id)
+
+    def on_row_toggle(self, task_id):
+        idx = self.task_index(task_id)
+        if idx is not None:
+            self.toggle_task(idx)
+
+    def on_row_edit(self, task_id):
+        idx = self.task_index(task_id)
+        if idx is not None:
+            self.edit_task(idx)
 
     def add_task(self):
-        task_text = self.task_entry.get().strip()
-        if task_text:
-            self.tasks[self.current_day].append({"text": task_text, "completed": False})
+        if self.store.add_task(self.current_day, self.task_entry.get()):
             self.task_entry.delete(0, "end")
             self.show_day_tasks(self.current_day)
-            self.save_tasks()
 
     def edit_task(self, task_index):
-        # Grab the task to edit
-        task = self.tasks[self.current_day][task_index]
+        # Grab the task to edit; it is found again by id when saved, since
+        # the list can change while the editor is open
+        day = self.current_day
+        task = self.tasks[day][task_index]
         
-        # Create a small edit frame in the tasks container
-        edit_frame = ctk.CTkFrame(self.tasks_container, fg_color="#3A3A3A")
-        edit_frame.pack(fill="x", pady=2)
+        # Create a small edit frame next to the task's row
+        edit_frame = self.active_list.create_editor(task["id"], fg_color="#3A3A3A")
         
         # Entry field for editing
         edit_entry = ctk.CTkEntry(
@@ -389,7 +963,7 @@ class TodoApp(ctk.CTk):
             text="Save",
             width=60,
             height=35,
-            command=lambda: self.save_edited_task(task_index, edit_entry.get(), edit_frame)
+            command=lambda: self.save_edited_task(day, task["id"], edit_entry.get(), edit_frame)
         )
         save_btn.pack(side="left", padx=5)
         
@@ -405,70 +979,205 @@ class TodoApp(ctk.CTk):
         )
         cancel_btn.pack(side="left")
 
-    def save_edited_task(self, task_index, new_text, edit_frame):
-        if new_text.strip():
-            # Update task text if not empty
-            self.tasks[self.current_day][task_index]["text"] = new_text.strip()
-        else:
-            # Delete task if input is empty
-            self.tasks[self.current_day].pop(task_index)
-        
-        self.show_day_tasks(self.current_day)
-        self.save_tasks()
+    def save_edited_task(self, day, task_id, new_text, edit_frame):
+        # Empty text deletes the task; one removed meanwhile is left alone
+        idx = self.store.task_index(day, task_id)
+        if idx is not None:
+            self.store.edit_task(day, idx, new_text)
+            if day == self.current_day:
+                self.show_day_tasks(day)
         edit_frame.destroy()
 
     def toggle_task(self, task_index):
-        task = self.tasks[self.current_day][task_index]
-        task["completed"] = not task["completed"]
+        self.store.toggle_task(self.current_day, task_index)
         self.show_day_tasks(self.current_day)
-        self.save_tasks()
 
-    def save_tasks(self):
-        """Save tasks and weather data to JSON file"""
-        data = {
-            "tasks": self.tasks,
-            "weather": {
-                "temperature": self.temperature,
-                "last_update": datetime.now().isoformat()
-            }
-        }
-        with open("tasks.json", "w") as f:
-            json.dump(data, f, indent=2)
+    def import_file(self, event=None):
+        """Stream an NDJSON or CSV file into the current day, one batch per idle slot"""
+        path = filedialog.askopenfilename(
+            title="Import tasks",
+            filetypes=[("Task files", "*.ndjson *.jsonl *.csv"), ("All files", "*.*")]
+        )
+        if path:
+            batches = import_batches(self.store, path, default_day=self.current_day)
+            self.after(1, self.continue_import, batches, 0)
 
-    def load_tasks(self):
-        """Load tasks and weather data from JSON file"""
-        if os.path.exists("tasks.json"):
+    def continue_import(self, batches, imported):
+        try:
+            imported += next(batches)
+        except StopIteration:
+            # Refresh the UI once, after the last batch
+            self.show_day_tasks(self.current_day)
+            self.on_search()
+            print(f"Imported {imported} tasks")
+        except Exception as e:
+            self.metrics.error("importing tasks", e)
+        else:
+            self.after(1, self.continue_import, batches, imported)
+
+    def export_file(self, event=None):
+        path = filedialog.asksaveasfilename(
+            title="Export tasks",
+            defaultextension=".ndjson",
+            filetypes=[("NDJSON", "*.ndjson"), ("CSV", "*.csv")]
+        )
+        if path:
             try:
-                with open("tasks.json", "r") as f:
-                    data = json.load(f)
-                    
-                    # Load tasks
-                    for day in self.days:
-                        self.tasks[day] = [
-                            t if isinstance(t, dict) 
-                            else {"text": t, "completed": False}
-                            for t in data.get("tasks", {}).get(day, [])
-                        ]
-                    
-                    # Load weather data if available and valid
-                    weather_data = data.get("weather", {})
-                    if weather_data:
-                        # Handle empty timestamp gracefully
-                        if weather_data.get("last_update"):
-                            try:
-                                last_update = datetime.fromisoformat(weather_data["last_update"])
-                                # Only use if less than 1 hour old
-                                if (datetime.now() - last_update).seconds < 3600:
-                                    self.temperature = weather_data.get("temperature", "N/A°F")
-                                    self.last_weather_update = last_update
-                            except ValueError:
-                                print("Invalid timestamp format, ignoring saved weather data")
-                        else:
-                            print("No timestamp found in weather data")
-                            
+                print(f"Exported {export_tasks(self.store, path)} tasks")
             except Exception as e:
-                print(f"Error loading data: {e}")
+                self.metrics.error("exporting tasks", e)
+
+    def archive_old_tasks(self):
+        """Move long-completed tasks to the archive, at most once an hour"""
+        # Scanning reads every day, so wait until after the first paint
+        if not self.started:
+            return
+        now = time.time()
+        if self.last_archive_run is not None and now - self.last_archive_run < ARCHIVE_INTERVAL:
+            return
+        self.last_archive_run = now
+        try:
+            archived = self.store.archive_completed(
+                self.archive, self.archive_after_days * 86400, now
+            )
+        except Exception as e:
+            self.metrics.error("archiving tasks", e)
+            return
+        if archived:
+            self.show_day_tasks(self.current_day)
+
+    def sync_tasks(self):
+        """Merge changes other instances made to tasks.json since the last check"""
+        if self.sync is None or not self.started:
+            return
+        try:
+            changed = self.sync.check()
+        except Exception as e:
+            self.metrics.error("syncing tasks", e)
+            return
+        if self.current_day in changed:
+            self.show_day_tasks(self.current_day)
+        if changed and self.search_entry.get().strip():
+            self.on_search()
+
+    def toggle_archive_view(self):
+        if self.archive_view is not None and self.archive_view.winfo_exists():
+            self.archive_view.destroy()
+            self.archive_view = None
+        else:
+            self.archive_view = ArchiveView(self, self.archive)
+
+    def save_tasks(self):
+        """Fold the journal into a fresh snapshot of tasks and weather data"""
+        with self.metrics.time("persist"):
+            self.store.save()
+
+    def checkpoint_tasks(self):
+        with self.metrics.time("checkpoint"):
+            self.store.checkpoint()
+
+    def toggle_debug_overlay(self, event=None):
+        """Show or hide live metrics over the task list; collection runs while it is shown"""
+        if self.debug_overlay is not None:
+            if self.overlay_timer is not None:
+                self.after_cancel(self.overlay_timer)
+                self.overlay_timer = None
+            self.debug_overlay.destroy()
+            self.debug_overlay = None
+            self.metrics.enabled = self.debug
+            return
+        self.metrics.enabled = True
+        self.debug_overlay = ctk.CTkLabel(
+            self,
+            text="",
+            font=("Courier", 11),
+            justify="left",
+            anchor="w",
+            fg_color="#1E1E1E",
+            text_color="#9CDC9C",
+            corner_radius=6
+        )
+        self.debug_overlay.place(relx=0, rely=1, x=5, y=-5, anchor="sw")
+        self.refresh_debug_overlay()
+
+    def refresh_debug_overlay(self):
+        if self.debug_overlay is None:
+            return
+        summary = self.metrics.summary()
+        lines = [f"{'op':<10}{'n':>5}{'p50':>7}{'p95':>7}{'max':>8}"]
+        for name, stats in summary["latency"].items():
+            lines.append(
+                f"{name:<10}{stats['count']:>5}{stats['p50_ms']:>7}{stats['p95_ms']:>7}{stats['max_ms']:>8.1f}"
+            )
+        for name, gauge in summary["gauges"].items():
+            lines.append(f"{name:<16}{gauge['last']:>6} (max {gauge['max']})")
+        for name, error in summary["errors"].items():
+            lines.append(f"errors {name}: {error['count']}")
+        self.debug_overlay.configure(text="\n".join(lines))
+        self.debug_overlay.lift()
+        self.overlay_timer = self.after(OVERLAY_REFRESH_MS, self.refresh_debug_overlay)
+
+    def dump_metrics(self, event=None):
+        """Write the collected metrics and startup timings to metrics.json"""
+        try:
+            path = self.metrics.dump(METRICS_PATH, startup=self.timings)
+            print(f"Metrics written to {path}")
+        except OSError as e:
+            print(f"Error writing metrics: {e}")
+
+    def load_tasks(self):
+        """Load tasks and weather data from the snapshot and journal"""
+        try:
+            with self.metrics.time("load"):
+                weather_data = self.store.load()
+
+            # Load weather data if available; old readings are still shown,
+            # marked with their age, until a fresh one arrives
+            if weather_data:
+                # Handle empty timestamp gracefully
+                if weather_data.get("last_update"):
+                    try:
+                        self.last_weather_update = datetime.fromisoformat(weather_data["last_update"])
+                        self.temperature = weather_data.get("temperature", "N/A°F")
+                    except ValueError:
+                        print("Invalid timestamp format, ignoring saved weather data")
+                else:
+                    print("No timestamp found in weather data")
+
+        except Exception as e:
+            self.metrics.error("loading data", e)
 
 if __name__ == "__main__":
-    app = TodoApp()
+    parser = argparse.ArgumentParser(description="Tado todo app")
+    parser.add_argument(
+        "--storage",
+        choices=["json", "sqlite"],
+        default="sqlite" if os.path.exists(DATABASE_PATH) else "json",
+        help="where tasks are kept (default: sqlite once tasks.db exists)"
+    )
+    parser.add_argument(
+        "--archive-after",
+        type=float,
+        default=ARCHIVE_AFTER_DAYS,
+        metavar="DAYS",
+        help="archive tasks completed more than DAYS days ago (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--timing",
+        action="store_true",
+        help="print import, load and first-paint times (seconds) as JSON to stderr"
+    )
+    parser.add_argument(
+        "--debug",
+        action="store_true",
+        help="collect latency and widget metrics from startup and write them to metrics.json on exit"
+    )
+    args = parser.parse_args()
+
+    app = TodoApp(
+        storage=SQLiteStorage() if args.storage == "sqlite" else JournalStorage(),
+        timing=args.timing,
+        archive_after_days=args.archive_after,
+        debug=args.debug
+    )
     app.mainloop()
@@ -0,0 +1,172 @@
+"""GUI-free task model for Tado; the app and the benchmarks both wrap it"""
+import time
+
+from search import SearchIndex
+from storage import JournalStorage, new_task_id
+
+DAYS = ["MONDAY", "TUESDAY", "WEDNESDAY", "THURSDAY", "FRIDAY", "SATURDAY", "SUNDAY"]
+
+class TaskStore:
+    """Tasks for each day, with every change forwarded to a storage backend"""
+    def __init__(self, storage=None, days=DAYS):
+        self.days = days
+        self.storage = storage or JournalStorage()
+        self.tasks = {day: [] for day in days}
+        self.search_index = SearchIndex(days)
+        self.indexed_days = set()
+
+    def load(self):
+        """Load tasks from storage and return the saved weather data"""
+        self.search_index = SearchIndex(self.days)
+        self.indexed_days = set()
+        try:
+            self.tasks, weather = self.storage.load(self.days)
+        except Exception:
+            # Start with empty days; the storage snapshots this same dict
+            self.tasks = self.storage.tasks = {day: [] for day in self.days}
+            raise
+        return weather
+
+    def task_index(self, day, task_id):
+        """Find the current position of a task within its day"""
+        for idx, task in enumerate(self.tasks[day]):
+            if task["id"] == task_id:
+                return idx
+        return None
+
+    def add_task(self, day, text):
+        """Append a task; blank text is ignored and returns None"""
+        text = text.strip()
+        if not text:
+            return None
+        task = {"id": new_task_id(), "text": text, "completed": False}
+        self.tasks[day].append(task)
+        self.storage.record_add(day, dict(task))
+        if day in self.indexed_days:
+            self.search_index.add(day, task)
+        return task
+
+    def add_tasks(self, records):
+        """Append many (day, text, completed) records; returns how many were added.
+
+        Each day's new tasks reach storage in a single call. Days a lazy
+        backend has not loaded yet are left unloaded.
+        """
+        by_day = {}
+        for day, text, completed in records:
+            text = text.strip()
+            if text:
+                by_day.setdefault(day, []).append(
+                    {"id": new_task_id(), "text": text, "completed": bool(completed)}
+                )
+        for day, tasks in by_day.items():
+            if day in self.tasks:
+                self.tasks[day].extend(tasks)
+            self.storage.record_add_many(day, [dict(task) for task in tasks])
+            if day in self.indexed_days:
+                for task in tasks:
+                    self.search_index.add(day, task)
+        return sum(len(tasks) for tasks in by_day.values())
+
+    def toggle_task(self, day, task_index):
+        task = self.tasks[day][task_index]
+        task["completed"] = not task["completed"]
+        # Completion time decides when the task moves to the archive
+        task["completed_at"] = time.time() if task["completed"] else None
+        self.storage.record_update(
+            day, task["id"], completed=task["completed"], completed_at=task["completed_at"]
+        )
+        return task
+
+    def edit_task(self, day, task_index, new_text):
+        """Change a task's text, deleting the task if the text is blank"""
+        if not new_text.strip():
+            return self.delete_task(day, task_index)
+        task = self.tasks[day][task_index]
+        task["text"] = new_text.strip()
+        self.storage.record_update(day, task["id"], text=task["text"])
+        if day in self.indexed_days:
+            self.search_index.update(day, task)
+        return task
+
+    def delete_task(self, day, task_index):
+        task = self.tasks[day].pop(task_index)
+        self.storage.record_delete(day, task["id"])
+        self.search_index.remove(task["id"])
+        return task
+
+    def replace_day(self, day, tasks):
+        """Swap in a day's merged task list; the caller saves afterwards"""
+        if day in self.indexed_days:
+            kept = {task["id"] for task in tasks}
+            for task in self.tasks[day]:
+                if task["id"] not in kept:
+                    self.search_index.remove(task["id"])
+            for task in tasks:
+                self.search_index.add(day, task)
+        self.tasks[day][:] = tasks
+
+    def archive_completed(self, archive, max_age, now=None):
+        """Move tasks completed more than max_age seconds ago into the archive.
+
+        Completed tasks from before completion times were recorded get
+        stamped now, so they are archived once they reach max_age too.
+        Returns the number of tasks archived.
+        """
+        now = time.time() if now is None else now
+        archived = 0
+        for day in self.days:
+            old, unstamped = [], []
+            for task in self.tasks[day]:
+                if not task["completed"]:
+                    continue
+                if task.get("completed_at") is None:
+                    unstamped.append(task)
+                elif now - task["completed_at"] >= max_age:
+                    old.append(task)
+
+            for task in unstamped:
+                task["completed_at"] = now
+                self.storage.record_update(day, task["id"], completed_at=now)
+            if not old:
+                continue
+
+            # Write the archive first so a crash can only duplicate, never lose
+            archive.append(day, old, now)
+            old_ids = {task["id"] for task in old}
+            self.tasks[day][:] = [task for task in self.tasks[day] if task["id"] not in old_ids]
+            self.storage.record_delete_many(day, old_ids)
+            for task_id in old_ids:
+                self.search_index.remove(task_id)
+            archived += len(old)
+        return archived
+
+    def search(self, query, limit=None):
+        """(day, task) pairs whose text matches every word of the query.
+
+        Each day is indexed in full the first time a search needs it; after
+        that the mutation methods above keep the index current.
+        """
+        for day in self.days:
+            if day not in self.indexed_days:
+                for task in self.tasks[day]:
+                    self.search_index.add(day, task)
+                self.indexed_days.add(day)
+        return self.search_index.search(query, limit)
+
+    def record_weather(self, temperature, last_update):
+        self.storage.record_weather(temperature, last_update)
+
+    def save(self):
+        """Fold pending changes into a full snapshot"""
+        self.storage.compact()
+
+    def checkpoint(self):
+        """Periodic autosave hook; lets the backend tidy up its files"""
+        self.storage.checkpoint()
+
+    def flush(self):
+        self.storage.flush()
+
+    def close(self):
+        self.storage.close()
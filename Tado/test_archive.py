@@ -0,0 +1,56 @@
+"""Reading an archive whose appends were interrupted"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from archive import TaskArchive
+
+class TornArchiveTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.archive = TaskArchive(os.path.join(directory, "tasks.archive.gz"))
+
+    def append(self, *texts):
+        tasks = [{"id": text, "text": text, "completed_at": 1.0} for text in texts]
+        self.archive.append("MONDAY", tasks, 2.0)
+
+    def tear_last_member(self, keep):
+        """Cut the last append short, as a crash partway through would"""
+        size = os.path.getsize(self.archive.path)
+        with open(self.archive.path, "r+b") as f:
+            f.truncate(self.before_last + keep)
+        return size
+
+    def texts(self):
+        return [record["text"] for record in self.archive.records()]
+
+    def test_members_after_a_torn_one_are_read(self):
+        self.append("first")
+        self.before_last = os.path.getsize(self.archive.path)
+        self.append(*[f"lost {n}" for n in range(200)])
+        self.tear_last_member(keep=40)
+        self.append("after crash")
+        self.append("later")
+
+        texts = self.texts()
+        self.assertEqual(texts[0], "first")
+        self.assertEqual(texts[-2:], ["after crash", "later"])
+        self.assertTrue(all(text.startswith("lost") for text in texts[1:-2]))
+
+    def test_torn_last_member_ends_the_records(self):
+        self.append("first")
+        self.before_last = os.path.getsize(self.archive.path)
+        self.append("second")
+        self.tear_last_member(keep=10)
+        self.assertEqual(self.texts(), ["first"])
+
+    def test_pages_span_members(self):
+        for n in range(5):
+            self.append(*[f"task {n}.{m}" for m in range(30)])
+        pages = list(self.archive.pages(page_size=40))
+        self.assertEqual([len(page) for page in pages], [40, 40, 40, 30])
+
+if __name__ == "__main__":
+    unittest.main()
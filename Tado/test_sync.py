@@ -0,0 +1,88 @@
+"""Two TaskStores sharing one tasks.json, as two Tado windows would"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from storage import JournalStorage
+from sync import SyncWatcher
+from task_store import TaskStore
+
+class TwoInstanceSyncTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def open_store(self, compact_after=500):
+        storage = JournalStorage(
+            os.path.join(self.directory, "tasks.json"),
+            os.path.join(self.directory, "tasks.journal"),
+            flush_window=0,
+            compact_after=compact_after
+        )
+        store = TaskStore(storage)
+        store.load()
+        watcher = SyncWatcher(store)
+        watcher.start()
+        self.addCleanup(store.close)
+        return store, watcher
+
+    def saved_texts(self, day):
+        store, _ = self.open_store()
+        return [task["text"] for task in store.tasks[day]]
+
+    def test_checkpoint_keeps_other_instance_task(self):
+        a, a_sync = self.open_store()
+        b, _ = self.open_store()
+        b.add_task("TUESDAY", "from b")
+        b.save()
+        b.close()
+
+        a.add_task("WEDNESDAY", "from a")
+        a.flush()
+        a.checkpoint()
+        a_sync.check()
+        a.flush()
+
+        self.assertEqual([task["text"] for task in a.tasks["TUESDAY"]], ["from b"])
+        self.assertEqual(self.saved_texts("TUESDAY"), ["from b"])
+        self.assertEqual(self.saved_texts("WEDNESDAY"), ["from a"])
+
+    def test_compaction_and_close_keep_other_instance_task(self):
+        a, _ = self.open_store(compact_after=3)
+        b, _ = self.open_store()
+        b.add_task("MONDAY", "from b")
+        b.save()
+        b.close()
+
+        # The third record compacts the journal into a new snapshot
+        for text in ("one", "two", "three"):
+            a.add_task("FRIDAY", text)
+        a.flush()
+        self.assertEqual(self.saved_texts("MONDAY"), ["from b"])
+
+        a.add_task("FRIDAY", "four")
+        a.save()
+        a.close()
+        self.assertEqual(self.saved_texts("MONDAY"), ["from b"])
+        self.assertEqual(self.saved_texts("FRIDAY"), ["one", "two", "three", "four"])
+
+    def test_merge_during_checkpoint_writes_one_snapshot(self):
+        a, _ = self.open_store()
+        b, _ = self.open_store()
+        b.add_task("TUESDAY", "from b")
+        b.save()
+        b.close()
+
+        a.add_task("WEDNESDAY", "from a")
+        a.flush()
+        snapshots = []
+        write_snapshot = a.storage.write_snapshot
+        a.storage.write_snapshot = lambda snapshot: (snapshots.append(snapshot), write_snapshot(snapshot))
+        a.checkpoint()
+        a.flush()
+        self.assertEqual(len(snapshots), 1)
+        self.assertEqual([task["text"] for task in snapshots[0]["tasks"]["TUESDAY"]], ["from b"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+"""WeatherClient against a local HTTP stand-in for the location and forecast APIs"""
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from weather import WeatherClient, expiry_time
+
+class WeatherHost(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, so connection reuse shows
+    connections = 0
+    location_status = 200
+    temperature = 70.0
+    forecast_headers = {}
+    requests = []
+
+    def setup(self):
+        super().setup()
+        WeatherHost.connections += 1
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        self.requests.append((url.path, parse_qs(url.query), self.headers.get("If-None-Match")))
+        if url.path == "/location":
+            if self.location_status != 200:
+                self.send_json(self.location_status, {"error": True})
+            else:
+                self.send_json(200, {"latitude": 40.0, "longitude": -70.0})
+        elif self.headers.get("If-None-Match") == '"t1"':
+            self.send_response(304)
+            self.send_header("ETag", '"t1"')
+            self.end_headers()
+        else:
+            self.send_json(200, {"current": {"temperature_2m": self.temperature}},
+                           dict(self.forecast_headers, ETag='"t1"'))
+
+    def send_json(self, status, data, headers=None):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class WeatherClientTest(unittest.TestCase):
+    def setUp(self):
+        WeatherHost.connections = 0
+        WeatherHost.location_status = 200
+        WeatherHost.temperature = 70.0
+        WeatherHost.forecast_headers = {}
+        WeatherHost.requests = []
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), WeatherHost)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.location_path = os.path.join(self.directory, "location.json")
+        self.weather_path = os.path.join(self.directory, "weather.json")
+
+    def client(self):
+        base = f"http://127.0.0.1:{self.server.server_port}"
+        client = WeatherClient(
+            location_url=base + "/location",
+            forecast_url=base + "/forecast",
+            cache_path=self.location_path,
+            weather_cache_path=self.weather_path
+        )
+        self.addCleanup(client.close)
+        return client
+
+    def paths(self):
+        return [path for path, _, _ in WeatherHost.requests]
+
+    def test_location_is_cached_on_disk(self):
+        self.assertEqual(self.client().fetch_temperature(), "70.0°F")
+        self.assertEqual(self.client().fetch_temperature(), "70.0°F")
+        self.assertEqual(self.paths(), ["/location", "/forecast", "/forecast"])
+        with open(self.location_path) as f:
+            self.assertEqual(json.load(f)["latitude"], 40.0)
+
+    def test_refreshes_reuse_one_connection(self):
+        client = self.client()
+        for _ in range(3):
+            client.fetch_temperature()
+        self.assertEqual(self.paths(), ["/location"] + ["/forecast"] * 3)
+        self.assertEqual(WeatherHost.connections, 1)
+
+    def test_failed_lookup_uses_stale_location(self):
+        with open(self.location_path, "w") as f:
+            json.dump({"latitude": 51.5, "longitude": -0.1, "fetched_at": time.time() - 30 * 86400}, f)
+        WeatherHost.location_status = 500
+        self.assertEqual(self.client().fetch_temperature(), "70.0°F")
+        _, query, _ = WeatherHost.requests[-1]
+        self.assertEqual((query["latitude"], query["longitude"]), (["51.5"], ["-0.1"]))
+
+    def test_unchanged_forecast_reuses_cached_reading(self):
+        self.assertEqual(self.client().fetch_temperature(), "70.0°F")
+        WeatherHost.temperature = 99.0
+        # A new client reads the validators back from weather.json
+        self.assertEqual(self.client().fetch_temperature(), "70.0°F")
+        _, _, etag = WeatherHost.requests[-1]
+        self.assertEqual(etag, '"t1"')
+
+    def test_no_store_reading_is_not_saved(self):
+        WeatherHost.forecast_headers = {"Cache-Control": "no-store"}
+        self.assertEqual(self.client().fetch_temperature(), "70.0°F")
+        self.assertFalse(os.path.exists(self.weather_path))
+
+class ExpiryTimeTest(unittest.TestCase):
+    now = 1000000.0
+
+    def test_max_age_less_age(self):
+        self.assertEqual(expiry_time({"Cache-Control": "public, max-age=600", "Age": "100"}, self.now),
+                         (self.now + 500, True))
+
+    def test_expires_against_server_date(self):
+        headers = {"Date": formatdate(5000, usegmt=True), "Expires": formatdate(5900, usegmt=True)}
+        self.assertEqual(expiry_time(headers, self.now), (self.now + 900, True))
+
+    def test_max_age_wins_over_expires(self):
+        headers = {"Cache-Control": "max-age=60", "Expires": formatdate(self.now + 900, usegmt=True)}
+        self.assertEqual(expiry_time(headers, self.now), (self.now + 60, True))
+
+    def test_no_cache_and_no_store(self):
+        self.assertEqual(expiry_time({"Cache-Control": "no-cache"}, self.now), (self.now, True))
+        self.assertEqual(expiry_time({"Cache-Control": "no-store"}, self.now), (self.now, False))
+
+    def test_default_ttl(self):
+        self.assertEqual(expiry_time({}, self.now, default_ttl=3600), (self.now + 3600, True))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,283 @@
+"""Weather lookups for Tado: cached IP geolocation plus Open-Meteo"""
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+
+LOCATION_URL = "https://ipapi.co/json/"
+FORECAST_URL = "https://api.open-meteo.com/v1/forecast"
+LOCATION_CACHE_PATH = "location.json"  # Kept next to tasks.json
+LOCATION_TTL = 7 * 24 * 3600  # Seconds; people rarely move
+WEATHER_CACHE_PATH = "weather.json"  # Last good reading, served while offline
+WEATHER_TTL = 3600  # Seconds a reading stays fresh when the server does not say
+BACKOFF_BASE = 60  # Seconds before retrying after the first failed fetch
+BACKOFF_MAX = 3600
+TIMEOUT = 5
+
+def parse_http_date(value):
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+def expiry_time(headers, now, default_ttl=WEATHER_TTL):
+    """When a response stops being fresh, from Cache-Control, Age and Expires.
+
+    Returns (expires_at, storable); no-cache expires at once so the next
+    check revalidates, and no-store responses must not be written to disk.
+    """
+    directives = {}
+    for part in (headers.get("Cache-Control") or "").lower().split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name] = value.strip('"')
+    storable = "no-store" not in directives
+    if "no-cache" in directives or "no-store" in directives:
+        return now, storable
+
+    if "max-age" in directives:
+        try:
+            age = float(headers.get("Age") or 0)
+            return now + max(0.0, int(directives["max-age"]) - age), storable
+        except ValueError:
+            pass
+    expires = parse_http_date(headers.get("Expires"))
+    if expires is not None:
+        # Measure against the server's clock rather than ours
+        served = parse_http_date(headers.get("Date")) or now
+        return now + max(0.0, expires - served), storable
+    return now + default_ttl, storable
+
+class WeatherClient:
+    """Fetches the temperature over one keep-alive session.
+
+    The IP geolocation is cached on disk for LOCATION_TTL, so a refresh is
+    normally a single request to an already open connection. The URLs can
+    be pointed at a local server for testing.
+    """
+    def __init__(self, location_url=LOCATION_URL, forecast_url=FORECAST_URL,
+                 cache_path=LOCATION_CACHE_PATH, location_ttl=LOCATION_TTL, timeout=TIMEOUT,
+                 weather_cache_path=WEATHER_CACHE_PATH, weather_ttl=WEATHER_TTL):
+        self.location_url = location_url
+        self.forecast_url = forecast_url
+        self.cache_path = cache_path
+        self.location_ttl = location_ttl
+        self.timeout = timeout
+        self.weather_cache_path = weather_cache_path
+        self.weather_ttl = weather_ttl
+        self.session = None
+        self.location = None
+        self.reading = None
+        self.reading_loaded = False
+
+    def get_session(self):
+        if self.session is None:
+            # Imported on first use, off the UI thread, to keep startup fast
+            import requests
+            self.session = requests.Session()
+        return self.session
+
+    def get_location(self):
+        """Return (latitude, longitude), or (None, None) if unknown"""
+        if self.location is None:
+            self.location = self.read_cached_location()
+        if self.location is None or time.time() - self.location["fetched_at"] >= self.location_ttl:
+            try:
+                response = self.get_session().get(self.location_url, timeout=self.timeout)
+                response.raise_for_status()
+                data = response.json()
+                self.location = {
+                    "latitude": data["latitude"],
+                    "longitude": data["longitude"],
+                    "fetched_at": time.time()
+                }
+                self.write_cached_location()
+            except Exception as e:
+                print(f"Location error: {e}")
+                # A stale location still beats no weather at all
+                if self.location is None:
+                    return None, None
+        return self.location["latitude"], self.location["longitude"]
+
+    def read_cached_location(self):
+        try:
+            with open(self.cache_path, "r") as f:
+                location = json.load(f)
+        except (OSError, ValueError):
+            return None
+        keys = ("latitude", "longitude", "fetched_at")
+        if not isinstance(location, dict) or not all(
+            isinstance(location.get(key), (int, float)) for key in keys
+        ):
+            return None
+        return location
+
+    def write_cached_location(self):
+        tmp_path = self.cache_path + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(self.location, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f"Error saving location: {e}")
+
+    def cached_reading(self):
+        """Last good reading: temperature, fetched_at, expires_at and validators"""
+        if not self.reading_loaded:
+            self.reading_loaded = True
+            try:
+                with open(self.weather_cache_path, "r") as f:
+                    reading = json.load(f)
+                if isinstance(reading, dict) and isinstance(reading.get("temperature"), str) and all(
+                    isinstance(reading.get(key), (int, float)) for key in ("fetched_at", "expires_at")
+                ):
+                    self.reading = reading
+            except (OSError, ValueError):
+                pass
+        return self.reading
+
+    def write_cached_reading(self, reading):
+        tmp_path = self.weather_cache_path + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(reading, f)
+            os.replace(tmp_path, self.weather_cache_path)
+        except OSError as e:
+            print(f"Error saving weather: {e}")
+
+    def fetch_temperature(self):
+        """Current temperature such as "72.5°F", or None without a location.
+
+        The cached reading's validators are sent along, so an unchanged
+        forecast costs a 304 with no body.
+        """
+        lat, lon = self.get_location()
+        if lat is None or lon is None:
+            return None
+        cached = self.cached_reading()
+        if cached is not None and (cached.get("latitude"), cached.get("longitude")) != (lat, lon):
+            cached = None
+        headers = {}
+        if cached is not None:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        response = self.get_session().get(
+            self.forecast_url,
+            params={
+                "latitude": lat,
+                "longitude": lon,
+                "current": "temperature_2m",
+                "temperature_unit": "fahrenheit"
+            },
+            headers=headers,
+            timeout=self.timeout
+        )
+        now = time.time()
+        if response.status_code == 304 and cached is not None:
+            temperature = cached["temperature"]
+        else:
+            response.raise_for_status()
+            data = response.json()
+            temperature = f"{data['current']['temperature_2m']}°F"
+
+        expires_at, storable = expiry_time(response.headers, now, self.weather_ttl)
+        self.reading = {
+            "temperature": temperature,
+            "fetched_at": now,
+            "expires_at": expires_at,
+            "etag": response.headers.get("ETag") or (cached or {}).get("etag"),
+            "last_modified": response.headers.get("Last-Modified") or (cached or {}).get("last_modified"),
+            "latitude": lat,
+            "longitude": lon
+        }
+        if storable:
+            self.write_cached_reading(self.reading)
+        return temperature
+
+    def close(self):
+        if self.session is not None:
+            self.session.close()
+
+class WeatherService:
+    """Runs at most one fetch at a time on a worker thread.
+
+    Results are queued rather than written to shared state, so the Tk loop
+    can pick them up with poll(). Latency and failures of every fetch are
+    kept in stats, and latency also goes to metrics when one is given.
+    Failed fetches are retried with exponential backoff.
+    """
+    def __init__(self, client=None, metrics=None):
+        self.client = client or WeatherClient()
+        self.metrics = metrics
+        self.results = queue.Queue()
+        self.lock = threading.Lock()
+        self.in_flight = False
+        self.latencies = deque(maxlen=100)
+        self.stats = {"fetches": 0, "failures": 0, "last_error": None}
+        self.consecutive_failures = 0
+        self.retry_at = 0.0
+
+    def due(self, now=None):
+        """True when the cached reading is stale and no backoff is pending"""
+        now = time.time() if now is None else now
+        if now < self.retry_at:
+            return False
+        reading = self.client.cached_reading()
+        return reading is None or now >= reading["expires_at"]
+
+    def request(self):
+        """Start a fetch unless one is already running; True if started"""
+        with self.lock:
+            if self.in_flight:
+                return False
+            self.in_flight = True
+        threading.Thread(target=self.run, daemon=True).start()
+        return True
+
+    def run(self):
+        start = time.perf_counter()
+        temperature, error = None, None
+        try:
+            temperature = self.client.fetch_temperature()
+            if temperature is None:
+                raise RuntimeError("location unavailable")
+        except Exception as e:
+            error = e
+        latency = time.perf_counter() - start
+        if self.metrics is not None:
+            self.metrics.record("network", latency)
+
+        # Queue the result before clearing in_flight so a poller that sees
+        # the fetch finished is guaranteed to find its result
+        self.results.put((temperature, error))
+        with self.lock:
+            self.latencies.append(latency)
+            self.stats["fetches"] += 1
+            if error is not None:
+                self.stats["failures"] += 1
+                self.stats["last_error"] = str(error)
+                self.consecutive_failures += 1
+                delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (self.consecutive_failures - 1))
+                self.retry_at = time.time() + delay
+            else:
+                self.consecutive_failures = 0
+                self.retry_at = 0.0
+            self.in_flight = False
+
+    def poll(self):
+        """Return every (temperature, error) pair that arrived since the last poll"""
+        results = []
+        while True:
+            try:
+                results.append(self.results.get_nowait())
+            except queue.Empty:
+                return results
+
+    def close(self):
+        self.client.close()